@@ -0,0 +1,24 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from .roles import resolve_role
+
+class RoleMiddleware:
+    # роль определяется один раз на запрос и доступна как request.role;
+    # под ASGI работает асинхронно, чтобы цепочка не переключалась в поток
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.role = resolve_role(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.role = await sync_to_async(resolve_role)(request)
+        return await self.get_response(request)
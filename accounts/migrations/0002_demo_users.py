@@ -1,4 +1,5 @@
 
+from django.contrib.auth.hashers import make_password
 from django.db import migrations
 
 def create_demo_users(apps, schema_editor):
@@ -13,7 +14,7 @@ def create_demo_users(apps, schema_editor):
     for username, password, role, is_staff, is_superuser in data:
         user, created = User.objects.get_or_create(username=username)
         if created:
-            user.set_password(password)
+            user.password = make_password(password)
         user.is_staff = is_staff
         user.is_superuser = is_superuser
         user.save()
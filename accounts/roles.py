@@ -0,0 +1,49 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from dashboard.versions import bump_labels, label_versions
+
+from .models import Profile
+
+# роль кешируется в сессии вместе с версией профиля; версия хранится в базе
+# (dashboard.ModelVersion), общей для всех процессов, и меняется при каждом
+# сохранении профиля
+ROLE_SESSION_KEY = '_role'
+
+def _version_label(user_id):
+    return f'accounts.profile:{user_id}'
+
+def profile_version(user_id):
+    return label_versions(_version_label(user_id))[0]
+
+def role_for_user(user):
+    if not user.is_authenticated:
+        return 'anon'
+    profile = getattr(user, 'profile', None)
+    if profile:
+        return profile.role
+    # без профиля is_staff роли не даёт — как и до появления общей функции
+    if user.is_superuser:
+        return 'admin'
+    return 'client'
+
+def resolve_role(request):
+    user = request.user
+    if not user.is_authenticated:
+        return 'anon'
+    # ProfileBackend загружает профиль вместе с пользователем — он уже в памяти
+    # и всегда актуален, сессия нужна только если пользователь получен иначе
+    if 'profile' in user._state.fields_cache:
+        return role_for_user(user)
+    version = profile_version(user.pk)
+    cached = request.session.get(ROLE_SESSION_KEY)
+    if cached and cached[0] == user.pk and cached[1] == version:
+        return cached[2]
+    role = role_for_user(user)
+    request.session[ROLE_SESSION_KEY] = [user.pk, version, role]
+    return role
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def bump_profile_version(sender, instance, **kwargs):
+    bump_labels(_version_label(instance.user_id))
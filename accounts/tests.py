@@ -0,0 +1,50 @@
+
+from django.contrib.auth.models import User
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from dashboard.tests import QueryBudgetTestCase
+
+from .models import Profile
+from .roles import role_for_user
+
+class AccountsQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        # выход завершает сессию — у него свой клиент, входящий заново перед замером
+        self.clients['leaving'] = Client()
+
+    def login_again(self):
+        self.clients['leaving'].force_login(self.admin)
+        return {}
+
+    def budgets(self):
+        return [
+            (reverse('accounts:login'), 0, 'anon', 200),
+            (reverse('accounts:user_create'), 2, 'staff', 200),
+            (reverse('accounts:logout'), 4, 'leaving', 302, self.login_again),
+        ]
+
+    def test_query_budgets(self):
+        self.assertQueryBudgets()
+
+class RoleTests(TestCase):
+    def test_staff_without_profile_is_client(self):
+        # is_staff без профиля прав менеджера не даёт
+        staff = User.objects.create(username='staff', is_staff=True)
+        superuser = User.objects.create(username='root', is_staff=True, is_superuser=True)
+        self.assertEqual(role_for_user(User.objects.get(pk=staff.pk)), 'client')
+        self.assertEqual(role_for_user(User.objects.get(pk=superuser.pk)), 'admin')
+
+    def test_role_change_reaches_cached_session(self):
+        # сессия ModelBackend хранит роль с версией профиля из базы — смена
+        # роли видна сразу, в каком бы процессе её ни сделали
+        user = User.objects.create(username='manager-role')
+        profile = Profile.objects.create(user=user, role='manager')
+        client = Client()
+        client.force_login(user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(client.get(reverse('dashboard:queue_list')).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.role = 'client'
+            profile.save()
+        self.assertEqual(client.get(reverse('dashboard:queue_list')).status_code, 403)
@@ -3,24 +3,24 @@ from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden
 from django.shortcuts import render
 
+from .roles import resolve_role, role_for_user
+
 def get_role(user):
-    if not user.is_authenticated:
-        return 'anon'
-    profile = getattr(user, 'profile', None)
-    if profile:
-        return profile.role
-    if user.is_superuser:
-        return 'admin'
-    if user.is_staff:
-        return 'manager'
-    return 'client'
+    return role_for_user(user)
+
+def request_role(request):
+    # RoleMiddleware уже вычислил роль; без него — вычисляем на месте
+    role = getattr(request, 'role', None)
+    if role is None:
+        role = request.role = resolve_role(request)
+    return role
 
 def role_required(*roles):
     def decorator(view_func):
         @wraps(view_func)
         @login_required
         def _wrapped(request, *args, **kwargs):
-            role = get_role(request.user)
+            role = request_role(request)
             if role not in roles:
                 return HttpResponseForbidden(render(request, '403.html'))
             return view_func(request, *args, **kwargs)
@@ -6,6 +6,7 @@ from django.contrib.auth.models import User
 
 from accounts.models import Profile
 from .forms import LoginForm, CreateUserForm
+from .utils import request_role
 
 def login_view(request):
     if request.method == 'POST':
@@ -25,9 +26,7 @@ def logout_view(request):
 
 @login_required
 def user_create(request):
-    profile = getattr(request.user, 'profile', None)
-    role = profile.role if profile else ('admin' if request.user.is_superuser else 'client')
-    if role != 'admin':
+    if request_role(request) != 'admin':
         from django.http import HttpResponseForbidden
         return HttpResponseForbidden('Доступ запрещён.')
     if request.method == 'POST':
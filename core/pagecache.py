@@ -0,0 +1,35 @@
+
+import hashlib
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from dashboard.versions import model_versions
+
+# Публичные страницы кешируются целиком для анонимных посетителей. В ключ входят
+# версии таблиц, из которых страница строится: после записи (сигналы post_save /
+# post_delete, массовые пути — вручную) ключ меняется и страница строится заново
+
+def _page_key(request, versions):
+    path = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    return f"public-page:{path}:{'-'.join(map(str, versions))}"
+
+def cache_public_page(*models):
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            # у авторизованных в шапке имя пользователя — им страница строится как обычно
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+            key = _page_key(request, model_versions(*models))
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, (response.content, response['Content-Type']), settings.PUBLIC_PAGE_CACHE_TIMEOUT)
+            return response
+        return _wrapped
+    return decorator
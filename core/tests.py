@@ -0,0 +1,65 @@
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from dashboard.models import OrderQueue
+from dashboard.tests import QueryBudgetTestCase, make_staff_client
+
+class CoreQueryBudgetTests(QueryBudgetTestCase):
+    def budgets(self):
+        # анонимным посетителям страницы строятся без кеша (он очищается перед
+        # замером), авторизованным кеш страниц не применяется вовсе
+        docs = reverse('core:docs_public')
+        return [
+            (reverse('core:index'), 3, 'anon', 200),
+            (reverse('core:index'), 4, 'staff', 200),
+            (reverse('core:public_queue'), 2, 'anon', 200),
+            (reverse('core:public_queue'), 3, 'staff', 200),
+            (reverse('core:public_kpi'), 3, 'anon', 200),
+            (reverse('core:public_kpi'), 4, 'staff', 200),
+            (reverse('core:public_incidents'), 2, 'anon', 200),
+            (reverse('core:public_incidents'), 3, 'staff', 200),
+            (reverse('core:public_shifts'), 2, 'anon', 200),
+            (reverse('core:public_shifts'), 3, 'staff', 200),
+            (reverse('core:public_reports'), 2, 'anon', 200),
+            (reverse('core:public_reports'), 3, 'staff', 200),
+            (docs, 1, 'anon', 200),
+            (docs, 3, 'staff', 200),
+            (docs + '?q=регламент', 1, 'anon', 200),
+            (docs + '?q=регламент', 3, 'staff', 200),
+            (reverse('core:docs_search') + '?q=регламент', 1, 'anon', 200),
+            (reverse('core:document_download', args=[self.document.slug]), 1, 'anon', 200),
+            (reverse('core:faq'), 0, 'anon', 200),
+            (reverse('core:services'), 0, 'anon', 200),
+            (reverse('core:news'), 0, 'anon', 200),
+            (reverse('core:about'), 0, 'anon', 200),
+            (reverse('core:contacts'), 0, 'anon', 200),
+            (reverse('core:contacts'), 1, 'anon', 200,
+             lambda: {'data': {'name': 'Посетитель', 'email': 'guest@example.com', 'message': 'Вопрос'}}),
+        ]
+
+    def test_query_budgets(self):
+        self.assertQueryBudgets()
+
+class PublicPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('core:public_queue')
+
+    def test_write_invalidates_cached_page(self):
+        self.assertEqual(Client().get(self.url).status_code, 200)
+        # версия таблицы меняется только после коммита: до него отдаётся кеш
+        OrderQueue.objects.create(title='Заявка без коммита', description='-')
+        self.assertNotContains(Client().get(self.url), 'Заявка без коммита')
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderQueue.objects.create(title='Заявка после коммита', description='-')
+        response = Client().get(self.url)
+        self.assertContains(response, 'Заявка без коммита')
+        self.assertContains(response, 'Заявка после коммита')
+
+    def test_signed_in_users_bypass_cache(self):
+        client = make_staff_client()
+        Client().get(self.url)
+        OrderQueue.objects.create(title='Свежая заявка', description='-')
+        self.assertContains(client.get(self.url), 'Свежая заявка')
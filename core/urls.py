@@ -12,6 +12,8 @@ urlpatterns = [
     path('public-shifts/', views.public_shifts, name='public_shifts'),
     path('public-reports/', views.public_reports, name='public_reports'),
     path('docs/', views.docs_public, name='docs_public'),
+    path('docs-search/', views.docs_search, name='docs_search'),
+    path('docs/<slug:slug>/', views.document_download, name='document_download'),
     path('faq/', views.faq, name='faq'),
     path('services/', views.services, name='services'),
     path('news/', views.news, name='news'),
@@ -1,41 +1,108 @@
 
-from django.shortcuts import render
+import os
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpResponseForbidden, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.conf import settings
 from django.utils import timezone
-from dashboard.models import Document, OrderQueue, KPIRecord, Incident, Shift, Report
+from dashboard.models import Document, OrderQueue, KPIRecord, KPIRollup, Incident, Shift, Report
+from accounts.utils import request_role
+from dashboard.counters import summary as counter_summary
+from dashboard.decorators import replica_reads
+from dashboard.delivery import serve_file
+from dashboard.downsample import downsample
+from dashboard.pagination import page_size
+from dashboard.rollups import bucket_start, choose_period, kpi_series
+from dashboard.search import highlight, search
 from .models import ContactMessage
+from .pagecache import cache_public_page
 
+@cache_public_page(OrderQueue, KPIRecord)
+@replica_reads(OrderQueue, KPIRecord)
 def index(request):
-    open_orders = OrderQueue.objects.filter(status__in=['new','in_progress']).count()
+    open_orders = counter_summary()['open_orders']
     kpi_sample = KPIRecord.objects.order_by('-timestamp')[:5]
     return render(request, 'core/index.html', {
         'open_orders': open_orders,
         'kpi_sample': kpi_sample,
     })
 
+@cache_public_page(OrderQueue)
+@replica_reads(OrderQueue)
 def public_queue(request):
     orders = OrderQueue.objects.order_by('-created_at')[:50]
     return render(request, 'core/public_queue.html', {'orders': orders})
 
+@cache_public_page(KPIRecord)
+@replica_reads(KPIRecord)
 def public_kpi(request):
-    last_7 = timezone.now() - timezone.timedelta(days=7)
-    kpi = KPIRecord.objects.filter(timestamp__gte=last_7)
-    return render(request, 'core/public_kpi.html', {'kpi': kpi})
+    span = timezone.timedelta(days=7)
+    since = timezone.now() - span
+    # последнее значение каждой метрики — из самого свежего дневного агрегата
+    latest = {}
+    daily = KPIRollup.objects.filter(period='day', bucket__gte=bucket_start(since, 'day')).order_by('metric', 'service_name', '-bucket')
+    for r in daily:
+        latest.setdefault((r.metric, r.service_name), r)
+    kpi = list(latest.values())
+    series = downsample(kpi_series(since, period=choose_period(span)), settings.KPI_CHART_POINTS)
+    return render(request, 'core/public_kpi.html', {'kpi': kpi, 'series_json': series})
 
+@cache_public_page(Incident)
+@replica_reads(Incident)
 def public_incidents(request):
     incidents = Incident.objects.order_by('-detected_at')[:50]
     return render(request, 'core/public_incidents.html', {'incidents': incidents})
 
+@cache_public_page(Shift)
+@replica_reads(Shift)
 def public_shifts(request):
     shifts = Shift.objects.select_related('employee').order_by('date')[:60]
     return render(request, 'core/public_shifts.html', {'shifts': shifts})
 
+@cache_public_page(Report)
+@replica_reads(Report)
 def public_reports(request):
-    reports = Report.objects.order_by('-created_at')[:20]
+    reports = Report.objects.filter(status='done').order_by('-created_at')[:20]
     return render(request, 'core/public_reports.html', {'reports': reports})
 
+def _visible_docs(request):
+    # авторизованным пользователям видны и документы их уровня доступа
+    return Document.objects.filter(access__in=Document.access_levels(request_role(request)))
+
 def docs_public(request):
-    docs = Document.objects.filter(access='public')
-    return render(request, 'core/docs_public.html', {'docs': docs})
+    docs = _visible_docs(request)
+    q = request.GET.get('q', '').strip()
+    if q:
+        docs = list(search(docs.defer('text'), q)[:50])
+        for d in docs:
+            d.snippet = highlight(d.search_snippet)
+    return render(request, 'core/docs_public.html', {'docs': docs, 'q': q})
+
+def docs_search(request):
+    q = request.GET.get('q', '').strip()
+    if not q:
+        return JsonResponse({'error': 'Не задан параметр q'}, status=400)
+    size = page_size(request.GET.get('limit'), 20)
+    docs = search(_visible_docs(request).defer('text'), q)[:size]
+    return JsonResponse({'results': [{
+        'slug': d.slug,
+        'title': d.title,
+        'access': d.access,
+        'snippet': str(highlight(d.search_snippet)),
+        'url': reverse('core:document_download', args=[d.slug]),
+    } for d in docs]})
+
+def document_download(request, slug):
+    doc = get_object_or_404(Document, slug=slug)
+    role = request_role(request)
+    if doc.access not in Document.access_levels(role):
+        if role == 'anon':
+            return redirect_to_login(request.get_full_path())
+        return HttpResponseForbidden('Доступ запрещён.')
+    if not doc.file or not os.path.exists(doc.file.path):
+        raise Http404('Файл документа не найден.')
+    return serve_file(request, doc.file, doc.download_name, content_hash=doc.content_hash)
 
 def faq(request):
     return render(request, 'core/faq.html')
@@ -1,6 +1,11 @@
 
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        from . import signals
+        post_migrate.connect(signals.seed_after_migrate, sender=self)
@@ -0,0 +1,112 @@
+
+from collections import Counter
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .changes import record_bulk_change
+from .counters import adjust, order_key
+from .models import OrderQueue
+from .search import search
+from .sla import recheck, refresh_urgency
+from .versions import bump_days, bump_models, day_of
+
+# Массовая правка заявок при разборе очереди: статус, приоритет и исполнитель
+# для списка id или фильтра — одна транзакция и один UPDATE. update() не вызывает
+# сигналы, поэтому срочность, счётчики, версии и журнал изменений меняются здесь.
+
+class BulkError(ValueError):
+    pass
+
+def parse_changes(data):
+    # пустое значение — поле не меняется; executor: null или 'none' — снять исполнителя
+    changes = {}
+    status = data.get('status')
+    if status:
+        if status not in dict(OrderQueue.STATUS_CHOICES):
+            raise BulkError('status: недопустимое значение')
+        changes['status'] = status
+    priority = data.get('priority')
+    if priority:
+        if priority not in dict(OrderQueue.PRIORITY_CHOICES):
+            raise BulkError('priority: недопустимое значение')
+        changes['priority'] = priority
+    if 'executor' in data and data.get('executor') != '':
+        executor = data.get('executor')
+        if executor in (None, 'none'):
+            changes['executor_id'] = None
+        else:
+            try:
+                changes['executor_id'] = User.objects.values_list('id', flat=True).get(pk=int(executor))
+            except (TypeError, ValueError, User.DoesNotExist):
+                raise BulkError('executor: пользователь не найден')
+    if not changes:
+        raise BulkError('не указано, что менять: status, priority или executor')
+    return changes
+
+def parse_ids(raw):
+    try:
+        ids = sorted({int(pk) for pk in raw})
+    except (TypeError, ValueError):
+        raise BulkError('ids: ожидается список номеров заявок')
+    if not ids:
+        raise BulkError('не выбрано ни одной заявки')
+    if len(ids) > settings.QUEUE_BULK_LIMIT:
+        raise BulkError(f'за раз можно изменить не больше {settings.QUEUE_BULK_LIMIT} заявок')
+    return ids
+
+def filter_ids(params):
+    # те же фильтры, что у queue_list: status, priority, q
+    qs = OrderQueue.objects.all()
+    if params.get('status'):
+        qs = qs.filter(status=params['status'])
+    if params.get('priority'):
+        qs = qs.filter(priority=params['priority'])
+    if params.get('q'):
+        qs = search(qs, params['q'])
+    ids = list(qs.order_by('id').values_list('id', flat=True)[:settings.QUEUE_BULK_LIMIT + 1])
+    if len(ids) > settings.QUEUE_BULK_LIMIT:
+        raise BulkError(f'под фильтр попало больше {settings.QUEUE_BULK_LIMIT} заявок — уточните фильтр')
+    return ids
+
+def bulk_update_orders(ids, changes):
+    # результат по каждому id: updated, unchanged или not_found
+    results = dict.fromkeys(ids, 'not_found')
+    with transaction.atomic():
+        rows = list(OrderQueue.objects.select_for_update().filter(id__in=ids)
+                    .values('id', 'status', 'priority', 'executor_id', 'created_at'))
+        changed = []
+        for row in rows:
+            if any(row[field] != value for field, value in changes.items()):
+                results[row['id']] = 'updated'
+                changed.append(row)
+            else:
+                results[row['id']] = 'unchanged'
+        if not changed:
+            return {'updated': 0, 'results': results}
+
+        changed_ids = [row['id'] for row in changed]
+        qs = OrderQueue.objects.filter(id__in=changed_ids)
+        fields = dict(changes)
+        status = changes.get('status')
+        if status and status not in OrderQueue.OPEN_STATUSES:
+            # закрытые заявки уходят из рабочего списка
+            fields['urgency_at'] = None
+        qs.update(**fields)
+        if 'status' in changes or 'priority' in changes:
+            for priority in {changes.get('priority', row['priority']) for row in changed}:
+                refresh_urgency(priority, qs)
+        if changes.get('status') in OrderQueue.OPEN_STATUSES and any(
+                row['status'] not in OrderQueue.OPEN_STATUSES for row in changed):
+            # закрытые заявки вернулись в работу — сроки могли уже пройти
+            recheck(qs)
+
+        deltas = Counter()
+        for row in changed:
+            deltas[order_key(row['status'], row['priority'])] -= 1
+            deltas[order_key(changes.get('status', row['status']), changes.get('priority', row['priority']))] += 1
+        adjust(deltas)
+        bump_days(day_of(row['created_at']) for row in changed)
+        bump_models(OrderQueue)
+        record_bulk_change(changed_ids, changes)
+    return {'updated': len(changed), 'results': results}
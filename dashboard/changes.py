@@ -0,0 +1,171 @@
+
+import asyncio
+import contextvars
+import json
+import logging
+from asgiref.sync import sync_to_async
+from collections import deque
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction
+from django.utils import dateformat, timezone
+
+from .models import ChangeEvent, Incident, OrderQueue
+
+# Живое обновление списков: сигналы пишут каждое изменение заявки или инцидента
+# в журнал ChangeEvent, а поток SSE отдаёт события после заданного номера.
+# Журнал читает один опросчик на процесс и раздаёт новые события всем открытым
+# потокам — ожидающее соединение не занимает ни поток, ни запросы к базе.
+
+logger = logging.getLogger(__name__)
+
+TOPICS = {
+    OrderQueue: 'order',
+    Incident: 'incident',
+}
+BUFFER_SIZE = 1000
+
+def _datetime(value):
+    return dateformat.format(timezone.localtime(value), 'd.m.Y H:i') if value else ''
+
+def row_data(instance):
+    # то же, что показывает строка queue_list / incidents_list
+    if isinstance(instance, OrderQueue):
+        return {
+            'title': instance.title,
+            'status': instance.status,
+            'status_display': instance.get_status_display(),
+            'priority': instance.priority,
+            'priority_display': instance.get_priority_display(),
+            'executor': str(instance.executor) if instance.executor_id else '',
+            'sla_deadline': _datetime(instance.sla_deadline),
+        }
+    return {
+        'title': instance.title,
+        'status': instance.status,
+        'criticality': instance.criticality,
+        'criticality_display': instance.get_criticality_display(),
+        'detected_at': _datetime(instance.detected_at),
+    }
+
+def record_change(instance, action):
+    topic = TOPICS[type(instance)]
+    object_id = instance.pk
+    data = {} if action == 'deleted' else row_data(instance)
+    # после коммита: откаченное изменение в журнал не попадёт, а номера событий
+    # выдаются почти в порядке фиксации — поток не пропустит событие из-за того,
+    # что транзакция с меньшим номером завершилась позже
+    transaction.on_commit(lambda: ChangeEvent.objects.create(
+        topic=topic, object_id=object_id, action=action, data=data,
+    ))
+
+def bulk_data(changes):
+    # новые значения, общие для всех заявок массовой правки
+    data = {}
+    if 'status' in changes:
+        data['status'] = changes['status']
+        data['status_display'] = dict(OrderQueue.STATUS_CHOICES)[changes['status']]
+    if 'priority' in changes:
+        data['priority'] = changes['priority']
+        data['priority_display'] = dict(OrderQueue.PRIORITY_CHOICES)[changes['priority']]
+    if 'executor_id' in changes:
+        executor = changes['executor_id'] and User.objects.filter(pk=changes['executor_id']).first()
+        data['executor'] = str(executor) if executor else ''
+    return data
+
+def record_bulk_change(ids, changes):
+    # одно событие на всю правку вместо события на каждую заявку
+    data = {'ids': list(ids), 'fields': bulk_data(changes)}
+    transaction.on_commit(lambda: ChangeEvent.objects.create(
+        topic='order', object_id=0, action='bulk', data=data,
+    ))
+
+def latest_change_id():
+    return ChangeEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+async def alatest_change_id():
+    return await ChangeEvent.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+def _event(row):
+    return {'id': row.id, 'topic': row.topic, 'object_id': row.object_id, 'action': row.action, 'data': row.data}
+
+async def changes_after(last_id, limit=BUFFER_SIZE):
+    rows = ChangeEvent.objects.filter(id__gt=last_id).order_by('id')[:limit]
+    return [_event(row) async for row in rows]
+
+def prune_changes(days):
+    return ChangeEvent.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).delete()[0]
+
+class ChangeFeed:
+    def __init__(self):
+        self.loop = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is loop:
+            return
+        self.loop = loop
+        self.buffer = deque(maxlen=BUFFER_SIZE)
+        # буфер содержит все события после floor; None — опросчик ещё не запущен
+        self.floor = None
+        self.last_id = None
+        self.changed = asyncio.Event()
+        # задача живёт дольше запроса, который её запустил: без его контекста
+        # запросы к базе не привязаны к потоку этого запроса
+        self.task = loop.create_task(self._poll(), context=contextvars.Context())
+
+    async def _poll(self):
+        while True:
+            started = self.last_id is None
+            try:
+                if started:
+                    self.floor = self.last_id = await alatest_change_id()
+                rows = await changes_after(self.last_id)
+            except Exception:
+                logger.exception('Не удалось прочитать журнал изменений')
+                await sync_to_async(close_old_connections)()
+                rows = []
+            if rows:
+                overflow = len(self.buffer) + len(rows) - BUFFER_SIZE
+                if overflow > 0:
+                    self.floor = (list(self.buffer) + rows)[overflow - 1]['id']
+                self.buffer.extend(rows)
+                self.last_id = rows[-1]['id']
+            if rows or (started and self.last_id is not None):
+                # будим всех ожидающих и ставим новое событие для следующих изменений
+                self.changed.set()
+                self.changed = asyncio.Event()
+            await asyncio.sleep(settings.CHANGE_FEED_POLL_SECONDS)
+
+    async def since(self, last_id):
+        # события после last_id: из буфера, а если клиент отстал сильнее — из базы
+        if self.floor is not None and last_id >= self.floor:
+            return [event for event in self.buffer if event['id'] > last_id]
+        return await changes_after(last_id)
+
+    def caught_up(self, last_id):
+        return self.last_id is not None and last_id >= self.last_id
+
+    async def stream(self, last_id, topics):
+        self._ensure_started()
+        # при обрыве браузер переподключится и пришлёт Last-Event-ID
+        yield 'retry: 5000\n\n'
+        while True:
+            changed = self.changed
+            events = await self.since(last_id)
+            for event in events:
+                last_id = event['id']
+                if event['topic'] in topics:
+                    payload = json.dumps({k: event[k] for k in ('object_id', 'action', 'data')}, ensure_ascii=False)
+                    yield f"id: {event['id']}\nevent: {event['topic']}\ndata: {payload}\n\n"
+            # отставший клиент дочитывает журнал из базы без паузы
+            if events and not self.caught_up(last_id):
+                continue
+            try:
+                await asyncio.wait_for(changed.wait(), settings.CHANGE_FEED_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:  # до Python 3.11 не совпадает со встроенным TimeoutError
+                # комментарий держит соединение открытым через прокси
+                yield ': ping\n\n'
+
+feed = ChangeFeed()
@@ -0,0 +1,92 @@
+
+from collections import Counter
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import DashboardCounter, Incident, KPIRecord, OrderQueue
+
+# Материализованные счётчики сводки: вместо COUNT по таблицам при каждом открытии
+# панели — одна выборка из маленькой таблицы. Меняются на ±1 из сигналов (и пачкой
+# при массовом приёме KPI); расхождение исправляет команда recount.
+
+INCIDENT_CLOSED = 'Закрыт'
+
+def order_key(status, priority):
+    if status not in OrderQueue.OPEN_STATUSES:
+        return None
+    return f'orders:{status}:{priority}'
+
+def incident_key(status, criticality):
+    if status == INCIDENT_CLOSED:
+        return None
+    return f'incidents:{criticality}'
+
+def kpi_key(service_name):
+    return f'kpi:{service_name}'
+
+def key_for(instance):
+    if isinstance(instance, OrderQueue):
+        return order_key(instance.status, instance.priority)
+    if isinstance(instance, Incident):
+        return incident_key(instance.status, instance.criticality)
+    return kpi_key(instance.service_name)
+
+def stored_key(model, pk):
+    # ключ записи в том виде, в каком она сейчас лежит в базе (до сохранения)
+    if model is OrderQueue:
+        row = model.objects.filter(pk=pk).values_list('status', 'priority').first()
+        return order_key(*row) if row else None
+    if model is Incident:
+        row = model.objects.filter(pk=pk).values_list('status', 'criticality').first()
+        return incident_key(*row) if row else None
+    row = model.objects.filter(pk=pk).values_list('service_name', flat=True).first()
+    return kpi_key(row) if row is not None else None
+
+def adjust(deltas):
+    with transaction.atomic():
+        for key, delta in deltas.items():
+            if not key or not delta:
+                continue
+            if DashboardCounter.objects.filter(key=key).update(value=F('value') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    DashboardCounter.objects.create(key=key, value=delta)
+            except IntegrityError:
+                DashboardCounter.objects.filter(key=key).update(value=F('value') + delta)
+
+def add_kpi_records(records):
+    adjust(Counter(kpi_key(rec.service_name) for rec in records))
+
+def actual_counts():
+    counts = {}
+    for row in OrderQueue.objects.filter(status__in=OrderQueue.OPEN_STATUSES).values('status', 'priority').annotate(n=Count('id')):
+        counts[order_key(row['status'], row['priority'])] = row['n']
+    for row in Incident.objects.exclude(status=INCIDENT_CLOSED).values('criticality').annotate(n=Count('id')):
+        counts[incident_key('', row['criticality'])] = row['n']
+    for row in KPIRecord.objects.values('service_name').annotate(n=Count('id')):
+        counts[kpi_key(row['service_name'])] = row['n']
+    return counts
+
+def recount():
+    # возвращает {ключ: (было, стало)} для разошедшихся счётчиков
+    with transaction.atomic():
+        stored = dict(DashboardCounter.objects.select_for_update().values_list('key', 'value'))
+        actual = actual_counts()
+        drift = {}
+        for key in set(stored) | set(actual):
+            if stored.get(key, 0) != actual.get(key, 0):
+                drift[key] = (stored.get(key, 0), actual.get(key, 0))
+        DashboardCounter.objects.exclude(key__in=list(actual)).delete()
+        for key, value in actual.items():
+            DashboardCounter.objects.update_or_create(key=key, defaults={'value': value})
+    return drift
+
+def summary():
+    # всё для сводки — одним запросом
+    data = dict(DashboardCounter.objects.values_list('key', 'value'))
+    return {
+        'open_orders': sum(v for k, v in data.items() if k.startswith('orders:')),
+        'incidents_open': sum(v for k, v in data.items() if k.startswith('incidents:')),
+        'kpi_count': sum(v for k, v in data.items() if k.startswith('kpi:')),
+    }
@@ -1,13 +1,80 @@
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
+from django.views.decorators.http import condition
+
+from accounts.utils import request_role
+from project.routers import replica_configured, routing_state
+
+from .versions import model_versions
 
 def role_required(roles):
     def decorator(view_func):
         def _wrapped(request, *args, **kwargs):
             if not request.user.is_authenticated:
                 raise PermissionDenied
-            profile = getattr(request.user, 'profile', None)
-            if not profile or profile.role not in roles:
+            if request_role(request) not in roles:
                 raise PermissionDenied
             return view_func(request, *args, **kwargs)
         return _wrapped
     return decorator
+
+def conditional_on(*models, roles=('admin', 'manager'), sliding_window=False):
+    # ETag и Last-Modified строятся из версий таблиц и параметров запроса:
+    # неизменившийся опрос получает 304 без основного запроса и сериализации.
+    # Без нужной роли условия не проверяются — ответ (403) даёт само представление
+    def _versions(request):
+        if not hasattr(request, '_model_versions'):
+            allowed = request.user.is_authenticated and request_role(request) in roles
+            request._model_versions = model_versions(*models) if allowed else None
+        return request._model_versions
+
+    def etag(request, *args, **kwargs):
+        versions = _versions(request)
+        if versions is None:
+            return None
+        key = f"{request.get_full_path()}|{'-'.join(map(str, versions))}"
+        if sliding_window:
+            # окно «последние N дней» (явное или по умолчанию, как у points)
+            # сдвигается и без записей — ключ меняется раз в минуту при любых параметрах
+            key += f'|{int(time.time() // 60)}'
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        versions = _versions(request)
+        if versions is None:
+            return None
+        return datetime.fromtimestamp(max(versions) / 1e9, tz=dt_timezone.utc)
+
+    def decorator(view_func):
+        # у скользящего окна ответ меняется и без записей, а Last-Modified по
+        # версиям таблиц этого не отражает — проверяется только ETag
+        conditional = condition(etag_func=etag, last_modified_func=None if sliding_window else last_modified)(view_func)
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if response.has_header('ETag'):
+                # клиент хранит ответ, но каждый раз сверяет его с сервером
+                response['Cache-Control'] = 'private, no-cache'
+            return response
+        return _wrapped
+    return decorator
+
+def replica_reads(*models):
+    # GET-запросы представления читают с реплики. Если таблица менялась позже
+    # REPLICA_LAG_SECONDS назад, чтение идёт с основной базы: иначе страница или
+    # ETag с новой версией попали бы в кеш с ещё старыми данными реплики
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            state = routing_state()
+            if state is not None and request.method in ('GET', 'HEAD') and replica_configured():
+                horizon = time.time_ns() - settings.REPLICA_LAG_SECONDS * 10 ** 9
+                state['replica'] = all(version < horizon for version in model_versions(*models))
+            return view_func(request, *args, **kwargs)
+        return _wrapped
+    return decorator
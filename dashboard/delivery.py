@@ -0,0 +1,121 @@
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+# Права проверяет Django, а передачу файла берёт на себя nginx (X-Accel-Redirect)
+# или, без nginx, сам Django с поддержкой Range и условных запросов.
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+def file_etag(path, content_hash=None):
+    if content_hash:
+        return quote_etag(content_hash)
+    stat = os.stat(path)
+    return quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+
+def _parse_range(header, size):
+    # поддерживается один диапазон; несколько — отдаём файл целиком
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if start == '' and end == '':
+        return None
+    if start == '':
+        length = int(end)
+        if length == 0 or size == 0:
+            # у пустого файла нет ни одного байта для суффикса — иначе вышло бы bytes 0--1/0
+            raise ValueError('empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError('unsatisfiable range')
+    return start, min(end, size - 1)
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+async def _aiterate(iterator):
+    # следующий кусок читается в потоке запроса: там же соединение с базой,
+    # которое держит курсор выгрузки
+    step = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await step(iterator, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close:
+            await sync_to_async(close, thread_sensitive=True)()
+
+def stream_body(request, iterator):
+    # синхронный итератор под ASGI Django сначала вычитывает целиком и только
+    # потом отправляет — весь файл или выгрузка оказались бы в памяти воркера
+    if isinstance(request, ASGIRequest):
+        return _aiterate(iter(iterator))
+    return iterator
+
+def serve_file(request, fieldfile, filename, content_hash=None, as_attachment=True):
+    path = fieldfile.path
+    etag = file_etag(path, content_hash)
+    last_modified = os.stat(path).st_mtime
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        return not_modified
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if settings.FILE_DELIVERY == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        # имя файла может быть кириллическим: без кодирования Django отправил бы
+        # заголовок в виде =?utf-8?b?...?=, который nginx не разбирает
+        response['X-Accel-Redirect'] = quote(settings.PROTECTED_MEDIA_PREFIX + fieldfile.name)
+    else:
+        size = os.path.getsize(path)
+        byte_range = None
+        range_header = request.headers.get('Range')
+        if_range = request.headers.get('If-Range')
+        if range_header and (not if_range or if_range == etag):
+            try:
+                byte_range = _parse_range(range_header, size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(stream_body(request, _read_range(path, start, end)),
+                                             status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        elif isinstance(request, ASGIRequest):
+            response = StreamingHttpResponse(stream_body(request, _read_range(path, 0, size - 1)), content_type=content_type)
+            response['Content-Length'] = str(size)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # браузер хранит копию, но каждый раз сверяет её с сервером (ответ 304)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,71 @@
+
+import logging
+import os
+from django.db.models import F
+
+from .models import Document
+
+# Текст загруженных документов извлекается фоновым обработчиком (run_report_worker),
+# а не в запросе загрузки. Повторно файл не разбирается, пока не изменится его хеш.
+
+TEXT_ENCODINGS = ('utf-8-sig', 'cp1251')
+
+logger = logging.getLogger(__name__)
+
+def _docx_text(path):
+    from docx import Document as DocxDocument
+    doc = DocxDocument(path)
+    parts = [p.text for p in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            parts.extend(cell.text for cell in row.cells)
+    return '\n'.join(p for p in parts if p.strip())
+
+def _txt_text(path):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode('utf-8', errors='replace')
+
+EXTRACTORS = {
+    '.docx': _docx_text,
+    '.txt': _txt_text,
+}
+
+def extract_text(path):
+    # неизвестный формат или отсутствие python-docx — пустой текст, документ
+    # ищется только по названию и описанию
+    extractor = EXTRACTORS.get(os.path.splitext(path)[1].lower())
+    if extractor is None:
+        return ''
+    try:
+        return extractor(path)
+    except ImportError:
+        return ''
+
+def pending_documents():
+    return Document.objects.exclude(content_hash='').exclude(text_hash=F('content_hash'))
+
+def extract_document(doc):
+    try:
+        text = extract_text(doc.file.path)
+    except Exception:
+        # битый, переименованный или отсутствующий файл (python-docx бросает и свои
+        # исключения, например PackageNotFoundError): текст пустой, хеш отмечается,
+        # чтобы обработчик не падал и не брал документ снова
+        logger.exception('Не удалось извлечь текст документа %s', doc.pk)
+        text = ''
+    # условное обновление: если файл успели заменить, запись обработается заново
+    return Document.objects.filter(pk=doc.pk, content_hash=doc.content_hash).update(
+        text=text, text_hash=doc.content_hash,
+    )
+
+def extract_pending(limit=None):
+    docs = pending_documents().only('id', 'file', 'content_hash').order_by('id')
+    if limit is not None:
+        docs = docs[:limit]
+    return sum(extract_document(doc) for doc in docs)
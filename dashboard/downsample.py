@@ -0,0 +1,78 @@
+
+from datetime import datetime
+
+METHODS = ('lttb', 'minmax')
+MAX_CHART_POINTS = 5000
+
+def _x(point):
+    return datetime.fromisoformat(point['timestamp']).timestamp()
+
+def _span(points, start, end):
+    # точка, представляющая корзину, несёт её минимум и максимум
+    lo = min(p['min'] for p in points[start:end])
+    hi = max(p['max'] for p in points[start:end])
+    return lo, hi
+
+def lttb(points, threshold):
+    # Largest-Triangle-Three-Buckets: сохраняет форму ряда и выбросы
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return points
+    xs = [_x(p) for p in points]
+    ys = [p['value'] for p in points]
+    every = (n - 2) / (threshold - 2)
+    sampled = [points[0]]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best_area = area
+                best = j
+        lo, hi = _span(points, start, end)
+        sampled.append(dict(points[best], min=lo, max=hi))
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+def minmax(points, threshold):
+    # по две точки на корзину: минимум и максимум, в порядке времени
+    n = len(points)
+    if threshold >= n or threshold < 2:
+        return points
+    buckets = threshold // 2
+    every = n / buckets
+    sampled = []
+    for i in range(buckets):
+        chunk = points[int(i * every):int((i + 1) * every)]
+        if not chunk:
+            continue
+        low = min(range(len(chunk)), key=lambda k: chunk[k]['min'])
+        high = max(range(len(chunk)), key=lambda k: chunk[k]['max'])
+        if low == high:
+            # минимум и максимум корзины — у одной точки (агрегат): обе крайние
+            # величины, иначе пик пропал бы с графика
+            p = chunk[low]
+            sampled.append(dict(p, value=p['min']))
+            if p['max'] != p['min']:
+                sampled.append(dict(p, value=p['max']))
+            continue
+        for k in sorted({low, high}):
+            p = chunk[k]
+            value = p['min'] if k == low else p['max']
+            sampled.append(dict(p, value=value))
+    return sampled
+
+def downsample(series, points, method='lttb'):
+    func = minmax if method == 'minmax' else lttb
+    return [dict(s, data=func(s['data'], points)) for s in series]
@@ -0,0 +1,85 @@
+
+import csv
+import json
+import zlib
+from datetime import datetime, time
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+CHUNK_SIZE = 2000
+# строки копятся в буфер и отдаются кусками ~64 КБ, а не по одной
+FLUSH_BYTES = 64 * 1024
+
+KPI_COLUMNS = ('id', 'metric', 'value', 'timestamp', 'service_name')
+ORDER_COLUMNS = ('id', 'title', 'status', 'priority', 'created_at', 'sla_deadline',
+                 'initiator__username', 'executor__username')
+
+class _Echo:
+    def write(self, value):
+        return value
+
+def parse_bound(raw, end=False):
+    # YYYY-MM-DD (граница суток) или полная дата-время ISO 8601
+    if not raw:
+        return None
+    day = parse_date(raw)
+    if day is not None:
+        value = datetime.combine(day, time.max if end else time.min)
+    else:
+        value = parse_datetime(raw)
+        if value is None:
+            raise ValueError(raw)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_cell(v) for v in row])
+
+def _ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, map(_cell, row))), ensure_ascii=False) + '\n'
+
+def _buffered(lines):
+    # первая строка уходит сразу, чтобы клиент получил ответ до выборки данных
+    buf = []
+    size = 0
+    first = True
+    for line in lines:
+        data = line.encode('utf-8')
+        buf.append(data)
+        size += len(data)
+        if first or size >= FLUSH_BYTES:
+            first = False
+            yield b''.join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield b''.join(buf)
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if first:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_rows(qs, columns, fmt='csv', gzip=False):
+    rows = qs.values_list(*columns).iterator(chunk_size=CHUNK_SIZE)
+    columns = [c.replace('__', '_') for c in columns]
+    lines = _ndjson_lines(columns, rows) if fmt == 'ndjson' else _csv_lines(columns, rows)
+    chunks = _buffered(lines)
+    return _gzipped(chunks) if gzip else chunks
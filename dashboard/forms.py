@@ -15,4 +15,4 @@ class DocumentForm(forms.ModelForm):
 class ReportForm(forms.ModelForm):
     class Meta:
         model = Report
-        fields = ['report_type', 'period_from', 'period_to']
+        fields = ['report_type', 'period_from', 'period_to', 'file_format']
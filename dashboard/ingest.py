@@ -0,0 +1,130 @@
+
+import csv
+import json
+import math
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .counters import add_kpi_records
+from .models import KPIRecord
+from .rollups import add_records
+from .versions import bump_days, bump_models, day_of
+
+FIELDS = ('metric', 'value', 'timestamp', 'service_name')
+MAX_ERRORS = 20
+
+class RowError(ValueError):
+    pass
+
+def _lines(stream):
+    # тело читается построчно, целиком в память не загружается; строка не в
+    # UTF-8 становится ошибкой строки, а не ответом 500. Вместе со строкой —
+    # её номер в теле запроса: по нему агент найдёт ошибку, пустые строки не сдвигают счёт
+    for number, raw in enumerate(stream, start=1):
+        try:
+            yield number, raw.decode('utf-8')
+        except UnicodeDecodeError:
+            yield number, RowError('некорректная кодировка')
+
+# итераторы отдают пары (номер строки, запись или RowError)
+
+def iter_ndjson(stream):
+    for number, line in _lines(stream):
+        if isinstance(line, RowError):
+            yield number, line
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, RowError('некорректный JSON')
+            continue
+        if not isinstance(row, dict):
+            yield number, RowError('строка должна быть JSON-объектом')
+            continue
+        yield number, row
+
+def iter_csv(stream):
+    # csv.DictReader принимает только строки: ошибки кодировки откладываются
+    # и выдаются перед следующей записью. Номер записи — строка, на которой она
+    # закончилась (запись в кавычках может занимать несколько строк)
+    bad = []
+    current = 0
+
+    def lines():
+        nonlocal current
+        for number, line in _lines(stream):
+            current = number
+            if isinstance(line, RowError):
+                bad.append((number, line))
+            else:
+                yield line
+
+    reader = csv.DictReader(lines())
+    missing = set(FIELDS) - set(reader.fieldnames or ())
+    if missing:
+        raise RowError(f"в заголовке CSV нет колонок: {', '.join(sorted(missing))}")
+    for row in reader:
+        yield from bad
+        bad.clear()
+        yield current, row
+    yield from bad
+
+def build_record(row):
+    metric = str(row.get('metric') or '').strip()
+    service_name = str(row.get('service_name') or '').strip()
+    if not metric or len(metric) > 100:
+        raise RowError('metric: пусто или длиннее 100 символов')
+    if not service_name or len(service_name) > 100:
+        raise RowError('service_name: пусто или длиннее 100 символов')
+    try:
+        value = float(row.get('value'))
+    except (TypeError, ValueError):
+        raise RowError('value: не число')
+    if not math.isfinite(value):
+        raise RowError('value: не конечное число')
+    try:
+        ts = parse_datetime(str(row.get('timestamp') or ''))
+    except ValueError:
+        ts = None
+    if ts is None:
+        raise RowError('timestamp: ожидается ISO 8601')
+    if timezone.is_naive(ts):
+        ts = timezone.make_aware(ts)
+    return KPIRecord(metric=metric, value=value, timestamp=ts, service_name=service_name)
+
+def _flush(batch):
+    with transaction.atomic():
+        KPIRecord.objects.bulk_create(batch)
+        add_records(batch)
+        bump_days(day_of(rec.timestamp) for rec in batch)
+        # bulk_create не шлёт post_save — версию для кеша страниц и счётчики меняем сами
+        bump_models(KPIRecord)
+        add_kpi_records(batch)
+
+def ingest(rows, batch_size=1000):
+    accepted = 0
+    rejected = 0
+    errors = []
+    batch = []
+    for line_no, row in rows:
+        try:
+            if isinstance(row, RowError):
+                raise row
+            batch.append(build_record(row))
+        except RowError as exc:
+            rejected += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append({'row': line_no, 'error': str(exc)})
+            continue
+        if len(batch) >= batch_size:
+            _flush(batch)
+            accepted += len(batch)
+            batch = []
+    if batch:
+        _flush(batch)
+        accepted += len(batch)
+    return {'accepted': accepted, 'rejected': rejected, 'errors': errors}
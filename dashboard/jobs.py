@@ -0,0 +1,64 @@
+import time
+import traceback
+from django.utils import timezone
+
+from reports.generator import build_report_file
+from reports.storage import store
+
+from .models import Report
+from .versions import period_version
+
+# очередь заданий — сами строки Report: queued -> running -> done/failed
+
+def claim_next_report():
+    while True:
+        pk = Report.objects.filter(status='queued').order_by('created_at', 'id').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        # условный UPDATE: задание забирает только один воркер
+        if Report.objects.filter(pk=pk, status='queued').update(status='running', started_at=timezone.now()):
+            return Report.objects.get(pk=pk)
+
+def requeue_stale(older_than):
+    # задания, «зависшие» в running после падения воркера, возвращаются в очередь
+    border = timezone.now() - older_than
+    return Report.objects.filter(status='running', started_at__lt=border).update(status='queued', started_at=None)
+
+def find_cached_report(report):
+    # готовый отчёт с той же версией данных или уже стоящее в очереди задание
+    current = period_version(report.period_from, report.period_to)
+    same = Report.objects.filter(
+        report_type=report.report_type,
+        period_from=report.period_from,
+        period_to=report.period_to,
+        file_format=report.file_format,
+    )
+    return (same.filter(status='done', data_version=current).order_by('-created_at').first()
+            or same.filter(status__in=['queued', 'running']).first())
+
+def run_report(report):
+    started = time.monotonic()
+    try:
+        # версия фиксируется до выборки: изменения во время формирования
+        # приведут к повторному формированию при следующем запросе
+        report.data_version = period_version(report.period_from, report.period_to)
+        report.file.name, report.content_hash = store(build_report_file(report))
+        report.status = 'done'
+        report.error = ''
+    except Exception:
+        report.status = 'failed'
+        report.error = traceback.format_exc(limit=5)
+    report.finished_at = timezone.now()
+    report.duration = time.monotonic() - started
+    report.save(update_fields=['file', 'content_hash', 'data_version', 'status', 'error', 'finished_at', 'duration'])
+    return report
+
+def run_pending(limit=None):
+    processed = 0
+    while limit is None or processed < limit:
+        report = claim_next_report()
+        if report is None:
+            break
+        run_report(report)
+        processed += 1
+    return processed
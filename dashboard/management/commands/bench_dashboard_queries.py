@@ -0,0 +1,56 @@
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+
+from dashboard.models import OrderQueue, Report
+
+class Command(BaseCommand):
+    help = 'Считает SQL-запросы на каждое представление панели (GET)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='admin')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Сколько раз вызывать каждое представление')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+        setup_test_environment()
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+
+        order = OrderQueue.objects.order_by('id').first()
+        report = Report.objects.order_by('id').first()
+        urls = [
+            ('home', reverse('dashboard:home')),
+            ('queue_list', reverse('dashboard:queue_list')),
+            ('queue_create', reverse('dashboard:queue_create')),
+            ('kpi_dashboard', reverse('dashboard:kpi_dashboard')),
+            ('incidents_list', reverse('dashboard:incidents_list')),
+            ('shifts_list', reverse('dashboard:shifts_list')),
+            ('reports_panel', reverse('dashboard:reports_panel')),
+            ('docs_manage', reverse('dashboard:docs_manage')),
+            ('client_home', reverse('dashboard:client_home')),
+            ('queue_api', reverse('dashboard:queue_api')),
+            ('kpi_api', reverse('dashboard:kpi_api')),
+        ]
+        if order:
+            urls.append(('queue_detail', reverse('dashboard:queue_detail', args=[order.pk])))
+            urls.append(('queue_edit', reverse('dashboard:queue_edit', args=[order.pk])))
+        if report:
+            urls.append(('report_download', reverse('dashboard:report_download', args=[report.pk])))
+
+        self.stdout.write(f"{'view':<20} {'status':>6} {'queries':>8}")
+        for name, url in urls:
+            counts = []
+            for _ in range(options['repeat']):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = client.get(url)
+                counts.append(len(ctx.captured_queries))
+            # первый вызов может включать запись сессии; показываем установившееся значение
+            self.stdout.write(f"{name:<20} {response.status_code:>6} {counts[-1]:>8}")
@@ -0,0 +1,127 @@
+
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from dashboard.counters import summary
+from dashboard.models import KPIRecord, OrderQueue
+from project.database import sqlite_options
+
+BENCH_TITLE = 'bench-db'
+# SQLite: как было (журнал DELETE, транзакции DEFERRED) и с настройками project/database.py
+SQLITE_PROFILES = {
+    'default': {'init_command': 'PRAGMA journal_mode=DELETE;'},
+    'tuned': sqlite_options(),
+}
+
+def _read(rng):
+    choice = rng.randrange(3)
+    if choice == 0:
+        list(OrderQueue.objects.select_related('initiator', 'executor').order_by('-created_at', '-id')[:20])
+    elif choice == 1:
+        summary()
+    else:
+        list(KPIRecord.objects.order_by('-timestamp')[:100])
+
+def _write(rng, created):
+    # новая заявка или смена статуса своей же заявки — с сигналами, как в представлениях
+    if created and rng.random() < 0.5:
+        order = OrderQueue.objects.get(pk=rng.choice(created))
+        order.status = rng.choice(('new', 'in_progress', 'done'))
+        order.save()
+    else:
+        order = OrderQueue.objects.create(title=BENCH_TITLE, description='', priority=rng.choice(('low', 'medium', 'high')))
+        created.append(order.pk)
+
+def _worker(seed, seconds, write_ratio, results):
+    rng = random.Random(seed)
+    reads, writes, errors, created = [], [], 0, []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        is_write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            _write(rng, created) if is_write else _read(rng)
+        except OperationalError:
+            # «database is locked» и подобные — считаем и продолжаем
+            errors += 1
+            continue
+        (writes if is_write else reads).append((time.perf_counter() - started) * 1000)
+    connections.close_all()
+    results.put((reads, writes, errors))
+
+def _percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест базы: N процессов со смесью чтений и записей (SQLite — на копии базы)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Доля операций записи')
+        parser.add_argument('--profiles', default='default,tuned', help='Профили SQLite через запятую')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        conn = connections['default']
+        self.stdout.write(f"{'профиль':<10} {'оп/с':>8} {'чтение p50':>11} {'p95':>8} {'запись p50':>11} {'p95':>8} {'ошибок':>7}")
+        if conn.vendor != 'sqlite':
+            self._run('текущий', options)
+            # заявки теста удаляются через ORM, чтобы сигналы поправили счётчики
+            for order in OrderQueue.objects.filter(title=BENCH_TITLE):
+                order.delete()
+            return
+        source = conn.settings_dict['NAME']
+        original = dict(conn.settings_dict)
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for name in options['profiles'].split(','):
+                # у каждого профиля своя свежая копия: режим журнала хранится в файле базы
+                path = os.path.join(tmpdir, f'{name}.sqlite3')
+                src, dst = sqlite3.connect(source), sqlite3.connect(path)
+                src.backup(dst)
+                src.close()
+                dst.close()
+                conn.settings_dict.update(NAME=path, OPTIONS=SQLITE_PROFILES[name])
+                self._run(name, options)
+        finally:
+            connections.close_all()
+            conn.settings_dict.clear()
+            conn.settings_dict.update(original)
+            for filename in os.listdir(tmpdir):
+                os.remove(os.path.join(tmpdir, filename))
+            os.rmdir(tmpdir)
+
+    def _run(self, name, options):
+        # соединения не должны переходить в дочерние процессы
+        connections.close_all()
+        ctx = multiprocessing.get_context('fork')
+        results = ctx.Queue()
+        workers = [
+            ctx.Process(target=_worker, args=(options['seed'] + i, options['seconds'], options['write_ratio'], results))
+            for i in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        reads, writes, errors = [], [], 0
+        for _ in workers:
+            r, w, e = results.get()
+            reads += r
+            writes += w
+            errors += e
+        for worker in workers:
+            worker.join()
+        rate = (len(reads) + len(writes)) / options['seconds']
+        self.stdout.write(
+            f"{name:<10} {rate:>8.0f} {_percentile(reads, 0.5):>9.1f}мс {_percentile(reads, 0.95):>6.1f}мс "
+            f"{_percentile(writes, 0.5):>9.1f}мс {_percentile(writes, 0.95):>6.1f}мс {errors:>7}"
+        )
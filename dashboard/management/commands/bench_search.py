@@ -0,0 +1,108 @@
+
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+
+from dashboard.search import TITLE_WEIGHT, fts_statements, match_expression, search_terms
+
+WORDS = (
+    'портал недоступен ошибка входа личный кабинет клиент сервер почта биллинг '
+    'отчёт сбой оплата доступ права пароль сеть задержка обработка запрос '
+    'обновление договор счёт принтер телефония резервное копирование диск '
+    'память база данных сертификат интеграция платёж уведомление расписание'
+).split()
+QUERIES = ['почта', 'личный кабинет', 'сбой биллинга', 'сертификат', 'резервное копирование диска', 'платежи']
+
+SYLLABLES = 'ба ве го да ке ли мо ну па ро су та фи хо це чу ша ще ю я ра ло ни ты'.split()
+
+def _vocabulary(rng, size):
+    # синтетический словарь с распределением Ципфа: частые и редкие слова, как в живом тексте
+    words = [''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(size)]
+    weights = [1 / (rank + 1) for rank in range(size)]
+    return words, list(itertools.accumulate(weights))
+
+def _text(rng, vocab, n):
+    words, cum = vocab
+    text = rng.choices(words, cum_weights=cum, k=n)
+    # слова предметной области встречаются в нескольких процентах заявок
+    if rng.random() < 0.1:
+        text[rng.randrange(n)] = rng.choice(WORDS)
+    return ' '.join(text)
+
+class Command(BaseCommand):
+    help = 'Замеряет поиск по заявкам: FTS5 против LIKE на отдельной временной базе SQLite'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20, help='Повторов каждого запроса FTS')
+        parser.add_argument('--like-repeat', type=int, default=3, help='Повторов каждого запроса LIKE')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocab = _vocabulary(rng, 50_000)
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            db = sqlite3.connect(path)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')
+            db.execute('CREATE TABLE orders (id INTEGER PRIMARY KEY, title TEXT NOT NULL, description TEXT NOT NULL)')
+            # тот же индекс и те же триггеры, что создаёт миграция
+            for sql in fts_statements('orders', 'orders_fts'):
+                db.execute(sql)
+
+            started = time.perf_counter()
+            batch = 10_000
+            for offset in range(0, options['rows'], batch):
+                count = min(batch, options['rows'] - offset)
+                db.executemany('INSERT INTO orders (title, description) VALUES (?, ?)',
+                               [(_text(rng, vocab, 5), _text(rng, vocab, 30)) for _ in range(count)])
+                db.commit()
+            load = time.perf_counter() - started
+            db.execute("INSERT INTO orders_fts(orders_fts) VALUES ('optimize')")
+            db.commit()
+            self.stdout.write(f"Строк: {options['rows']}, вставка с индексированием: {load:.1f} с")
+
+            fts_sql = (
+                f"SELECT o.id, snippet(orders_fts, -1, '[', ']', '…', 16) FROM orders o, orders_fts "
+                f"WHERE orders_fts.rowid = o.id AND orders_fts MATCH ? "
+                f"ORDER BY bm25(orders_fts, {TITLE_WEIGHT}, 1.0), o.id DESC LIMIT 20"
+            )
+            count_sql = 'SELECT count(*) FROM orders_fts WHERE orders_fts MATCH ?'
+            self.stdout.write(f"{'запрос':<30} {'найдено':>9} {'FTS мед.':>10} {'FTS p95':>10} {'LIKE мед.':>10}")
+            for query in QUERIES:
+                match = match_expression(search_terms(query))
+                found = db.execute(count_sql, [match]).fetchone()[0]
+                fts_times = []
+                for _ in range(options['repeat']):
+                    t = time.perf_counter()
+                    db.execute(fts_sql, [match]).fetchall()
+                    fts_times.append((time.perf_counter() - t) * 1000)
+                like_sql = 'SELECT id FROM orders WHERE ' + ' AND '.join(
+                    '(title LIKE ? OR description LIKE ?)' for _ in search_terms(query)
+                ) + ' ORDER BY id DESC LIMIT 20'
+                like_params = []
+                for term in search_terms(query):
+                    like_params += [f'%{term}%', f'%{term}%']
+                like_times = []
+                for _ in range(options['like_repeat']):
+                    t = time.perf_counter()
+                    db.execute(like_sql, like_params).fetchall()
+                    like_times.append((time.perf_counter() - t) * 1000)
+                fts_times.sort()
+                p95 = fts_times[min(len(fts_times) - 1, int(len(fts_times) * 0.95))]
+                self.stdout.write(
+                    f'{query:<30} {found:>9} {statistics.median(fts_times):>8.1f}мс {p95:>8.1f}мс '
+                    f'{statistics.median(like_times):>8.1f}мс'
+                )
+            db.close()
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
@@ -0,0 +1,82 @@
+
+import random
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from dashboard.models import OrderQueue
+from dashboard.sla import due_orders, scan
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Замеряет проход сканера SLA на N открытых заявках (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=30, help='Сроки равномерно на ближайшие N дней')
+        parser.add_argument('--step-minutes', type=int, default=5, help='Интервал между проходами сканера')
+        parser.add_argument('--passes', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Тестовые заявки удалены (транзакция откачена)')
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        span = options['days'] * 86400
+        table = OrderQueue._meta.db_table
+        adapt = connection.ops.adapt_datetimefield_value
+        sql = (f'INSERT INTO {table} (title, description, status, priority, created_at, sla_deadline) '
+               f'VALUES (%s, %s, %s, %s, %s, %s)')
+        started = time.perf_counter()
+        batch = 10_000
+        with connection.cursor() as cursor:
+            for offset in range(0, options['orders'], batch):
+                count = min(batch, options['orders'] - offset)
+                cursor.executemany(sql, [(
+                    'bench', '', rng.choice(OrderQueue.OPEN_STATUSES), rng.choice(('low', 'medium', 'high')),
+                    adapt(now), adapt(now + timedelta(seconds=rng.uniform(60, span))),
+                ) for _ in range(count)])
+        self.stdout.write(f"Открытых заявок: {options['orders']}, вставка: {time.perf_counter() - started:.1f} с")
+
+        # первый проход фиксирует отметку; дальше каждый проход видит только новые сроки
+        scan(now=now, open_incidents=False)
+        step = timedelta(minutes=options['step_minutes'])
+        times = []
+        events = []
+        for i in range(1, options['passes'] + 1):
+            t = time.perf_counter()
+            result = scan(now=now + step * i, open_incidents=False)
+            times.append((time.perf_counter() - t) * 1000)
+            events.append(result['breach'] + result['warning'])
+        self.stdout.write(
+            f"Проход сканера: медиана {statistics.median(times):.1f} мс, макс. {max(times):.1f} мс, "
+            f"событий за проход в среднем {statistics.mean(events):.0f}"
+        )
+
+        # для сравнения — тот же отбор без индекса (полный просмотр таблицы)
+        since, until = now + step, now + step * 2
+        plan = due_orders(since, until).explain()
+        self.stdout.write('План запроса сканера:\n' + plan)
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                for label, hint in (('по индексу', ''), ('без индекса', 'NOT INDEXED')):
+                    t = time.perf_counter()
+                    cursor.execute(
+                        f"SELECT id FROM {table} {hint} WHERE status IN ('new', 'in_progress') "
+                        f"AND sla_deadline > %s AND sla_deadline <= %s ORDER BY sla_deadline, id",
+                        [adapt(since), adapt(until)],
+                    )
+                    found = len(cursor.fetchall())
+                    self.stdout.write(f'Отбор {label}: {(time.perf_counter() - t) * 1000:.1f} мс ({found} заявок)')
@@ -0,0 +1,165 @@
+
+import json
+import platform
+import statistics
+import time
+from datetime import timedelta
+from django import get_version
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from dashboard.models import Document, Incident, KPIRecord, OrderQueue, Report
+
+# Замер всех адресов core/urls.py и dashboard/urls.py тестовым клиентом:
+# p50/p95 и число SQL-запросов. Результат пишется в JSON и сравнивается с
+# прошлым замером (--compare) — так видно, что изменение замедлило страницу.
+
+# не GET или бесконечный поток — не замеряются
+SKIP = {
+    'queue_bulk': 'только POST',
+    'queue_bulk_api': 'только POST',
+    'kpi_ingest': 'только POST',
+    'changes_stream': 'поток SSE',
+}
+# страницы, которые чаще всего открывают не в исходном виде
+VARIANTS = {
+    'queue_list': ['?sort=worklist', '?q=портал', '?cursor='],
+    'incidents_list': ['?q=сбой'],
+    'queue_api': ['?sort=worklist', '?q=почта'],
+    'kpi_api': ['?days=30', '?days=365', '?points=500'],
+    'docs_public': ['?q=регламент'],
+}
+
+def _samples():
+    order = OrderQueue.objects.order_by('-id').first()
+    report = Report.objects.filter(status='done').order_by('-id').first() or Report.objects.order_by('-id').first()
+    document = Document.objects.order_by('id').first()
+    return {
+        'queue_detail': {'pk': order.pk} if order else None,
+        'queue_edit': {'pk': order.pk} if order else None,
+        'report_download': {'pk': report.pk} if report else None,
+        'document_download': {'slug': document.slug} if document else None,
+    }
+
+def _urls():
+    # (имя, адрес, анонимно ли) для каждого маршрута; выгрузки — за последние сутки
+    samples = _samples()
+    since = (timezone.localdate() - timedelta(days=1)).isoformat()
+    params = {'kpi_export': f'?from={since}', 'queue_export': f'?from={since}'}
+    for namespace, anonymous in (('core', True), ('dashboard', False)):
+        for pattern in get_resolver(f'{namespace}.urls').url_patterns:
+            name = pattern.name
+            if name in SKIP:
+                continue
+            kwargs = {}
+            if pattern.pattern.converters:
+                kwargs = samples.get(name)
+                if kwargs is None:
+                    continue
+            url = reverse(f'{namespace}:{name}', kwargs=kwargs) + params.get(name, '')
+            yield name, url, anonymous
+            for query in VARIANTS.get(name, ()):
+                yield f'{name}{query}', url + query, anonymous
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+class Command(BaseCommand):
+    help = 'Замеряет p50/p95 и число запросов для всех адресов портала и панели, пишет JSON для сравнения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='admin', help='Под кем открывать панель')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help='Куда записать результат (JSON)')
+        parser.add_argument('--compare', help='Прошлый результат (JSON) для сравнения')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Допустимый рост p95, доля (0.25 — на 25%%)')
+        parser.add_argument('--strict', action='store_true', help='Завершиться с ошибкой при регрессии')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+        setup_test_environment()
+        staff = Client(raise_request_exception=False)
+        staff.force_login(user)
+        anonymous = Client(raise_request_exception=False)
+
+        results = {}
+        for name, url, is_public in _urls():
+            client = anonymous if is_public else staff
+            results[name] = self._measure(client, url, options['repeat'])
+
+        data = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'django': get_version(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'repeat': options['repeat'],
+                'rows': {model.__name__: model.objects.count() for model in (OrderQueue, Incident, KPIRecord, User)},
+            },
+            'results': results,
+        }
+        regressions = self._report(results, baseline, options['tolerance'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результат записан: {options['output']}")
+        if regressions and options['strict']:
+            raise CommandError(f"Регрессии: {', '.join(regressions)}")
+
+    def _measure(self, client, url, repeat):
+        times = []
+        queries = 0
+        # первый запрос прогревает кеши и сессию и в замер не входит
+        for attempt in range(repeat + 1):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+                elapsed = (time.perf_counter() - started) * 1000
+            if attempt:
+                times.append(elapsed)
+                queries = len(ctx.captured_queries)
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(statistics.median(times), 2),
+            'p95_ms': round(_percentile(times, 0.95), 2),
+            'queries': queries,
+        }
+
+    def _report(self, results, baseline, tolerance):
+        regressions = []
+        header = f"{'адрес':<36} {'код':>4} {'p50, мс':>9} {'p95, мс':>9} {'запросов':>9}"
+        if baseline:
+            header += f" {'Δp95':>8} {'Δзапр.':>7}"
+        self.stdout.write(header)
+        for name, r in results.items():
+            line = f"{name[:36]:<36} {r['status']:>4} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['queries']:>9}"
+            old = (baseline or {}).get(name)
+            if old:
+                growth = (r['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0
+                line += f" {growth:>+8.0%} {r['queries'] - old['queries']:>+7}"
+                # доли миллисекунды — шум, регрессией не считаются
+                slower = growth > tolerance and r['p95_ms'] - old['p95_ms'] > 1
+                if slower or r['queries'] > old['queries'] or r['status'] != old['status']:
+                    regressions.append(name)
+                    line += '  регрессия'
+            elif baseline is not None:
+                line += '  новый'
+            self.stdout.write(line)
+        return regressions
@@ -0,0 +1,24 @@
+
+import sqlite3
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from project.routers import REPLICA, replica_configured
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файл реплики (DATABASE_REPLICA_URL=sqlite:///...) для локальной проверки'
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError('Реплика не настроена: задайте DATABASE_REPLICA_URL')
+        primary, replica = connections['default'], connections[REPLICA]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Копирование поддерживается только между файлами SQLite')
+        # снимок на момент копирования: до следующего запуска реплика «отстаёт»
+        replica.close()
+        src = sqlite3.connect(primary.settings_dict['NAME'])
+        dst = sqlite3.connect(replica.settings_dict['NAME'])
+        src.backup(dst)
+        src.close()
+        dst.close()
+        self.stdout.write(self.style.SUCCESS(f"Реплика обновлена: {replica.settings_dict['NAME']}"))
@@ -0,0 +1,34 @@
+
+import os
+from django.core.management.base import BaseCommand
+
+from dashboard.models import Report
+from reports.storage import orphan_files
+
+class Command(BaseCommand):
+    help = 'Удаляет старые отчёты (оставляя N последних каждого типа) и файлы без ссылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=20,
+                            help='Сколько последних готовых отчётов каждого типа оставить')
+        parser.add_argument('--grace', type=int, default=30,
+                            help='Через сколько минут файл отчёта без ссылки считается брошенным')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        stale = []
+        for report_type, _ in Report.REPORT_TYPES:
+            ids = Report.objects.filter(report_type=report_type, status__in=['done', 'failed']).order_by('-created_at', '-id').values_list('id', flat=True)
+            stale.extend(ids[options['keep']:])
+        if not options['dry_run']:
+            Report.objects.filter(id__in=stale).delete()
+        referenced = set(Report.objects.exclude(file='').values_list('file', flat=True))
+        removed = 0
+        for path in orphan_files(referenced, grace=options['grace'] * 60):
+            if not options['dry_run']:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            removed += 1
+        self.stdout.write(self.style.SUCCESS(f'Удалено отчётов: {len(stale)}, файлов: {removed}'))
@@ -0,0 +1,207 @@
+
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Profile
+from dashboard.counters import recount
+from dashboard.models import Incident, KPIRecord, OrderQueue, Report, Shift
+from dashboard.rollups import rebuild_rollups
+from dashboard.sla import apply_sla
+from dashboard.versions import bump_days, bump_models, day_of
+
+# Синтетические данные в объёмах эксплуатации: bulk_create пачками. Сигналы при
+# этом не срабатывают, поэтому сроки SLA, агрегаты KPI, версии и счётчики сводки
+# заполняются здесь так же, как в остальных массовых путях.
+
+USER_PREFIX = 'load-'
+SERVICES = ['Портал клиентов', 'Система биллинга', 'Почтовый сервер', 'Личный кабинет',
+            'Телефония', 'Резервное копирование', 'База данных', 'Интеграция с банком']
+METRICS = {
+    'Доступность сервиса': (97.0, 100.0),
+    'Среднее время решения': (0.5, 12.0),
+    'Время отклика, мс': (40.0, 900.0),
+    'Загрузка процессора, %': (5.0, 95.0),
+    'Ошибок в минуту': (0.0, 30.0),
+}
+SUBJECTS = ['портал', 'личный кабинет', 'биллинг', 'почта', 'принтер', 'VPN', 'телефония',
+            'отчёт', 'сертификат', 'резервное копирование', 'база данных', 'доступ']
+PROBLEMS = ['не открывается', 'работает медленно', 'выдаёт ошибку', 'недоступен',
+            'требует настройки', 'не синхронизируется', 'нужно продление', 'нет прав']
+DETAILS = ['Проблема воспроизводится у нескольких сотрудников.', 'Ошибка появилась после обновления.',
+           'Пользователь приложил снимок экрана.', 'Срочно: влияет на работу с клиентами.',
+           'Повторное обращение, ранее заявка закрывалась.', 'Нужна консультация инженера.']
+INCIDENT_STATUSES = ['Открыт', 'В работе']
+
+@contextmanager
+def _keep_created_at(model):
+    # auto_now_add перезаписал бы даты в прошлом, которые задаёт генератор
+    field = model._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+def _batches(total, size):
+    for offset in range(0, total, size):
+        yield min(size, total - offset)
+
+class Command(BaseCommand):
+    help = 'Создаёт синтетические данные в объёмах эксплуатации (заявки, инциденты, KPI, смены, пользователи)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kpi', type=int, default=1_000_000)
+        parser.add_argument('--orders', type=int, default=200_000)
+        parser.add_argument('--incidents', type=int, default=50_000)
+        parser.add_argument('--users', type=int, default=5_000)
+        parser.add_argument('--shift-days', type=int, default=365, help='Смены на N дней вперёд от начала периода')
+        parser.add_argument('--days', type=int, default=365, help='Данные распределяются по последним N дням')
+        parser.add_argument('--scale', type=float, default=1.0, help='Множитель всех объёмов (0.01 — быстрая проверка)')
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+        scale = options['scale']
+        count = {name: max(1, int(options[name] * scale)) for name in ('kpi', 'orders', 'incidents', 'users')}
+
+        clients, staff = self._step('пользователи', self._users, count['users'])
+        order_ids = self._step('заявки', self._orders, count['orders'], clients, staff)
+        self._step('инциденты', self._incidents, count['incidents'], order_ids)
+        self._step('KPI', self._kpi, count['kpi'])
+        self._step('смены', self._shifts, options['shift_days'], staff)
+
+        # производные данные: агрегаты KPI за период, версии для кешей, счётчики сводки
+        self._step('агрегаты KPI', lambda: rebuild_rollups(since=self.start))
+        days = [self.start.date() + timedelta(days=i) for i in range(options['days'] + 1)]
+        bump_days(days)
+        bump_models(OrderQueue, Incident, KPIRecord, Shift, Report)
+        drift = recount()
+        self.stdout.write(self.style.SUCCESS(f'Готово, пересчитано счётчиков: {len(drift)}'))
+
+    def _step(self, label, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        self.stdout.write(f'{label}: {time.perf_counter() - started:.1f} с')
+        return result
+
+    def _moment(self):
+        # чем ближе к текущему дню, тем больше записей
+        share = self.rng.random() ** 0.5
+        return self.start + (self.now - self.start) * share
+
+    def _users(self, total):
+        offset = User.objects.filter(username__startswith=USER_PREFIX).count()
+        password = make_password(None)
+        clients, staff = [], []
+        for size in _batches(total, self.batch):
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(username=f'{USER_PREFIX}{offset + i:07d}', password=password,
+                         email=f'{USER_PREFIX}{offset + i:07d}@example.com')
+                    for i in range(size)
+                ])
+                offset += size
+                profiles = []
+                for user in users:
+                    role = self.rng.choices(('client', 'manager', 'admin'), weights=(90, 9, 1))[0]
+                    user.is_staff = role != 'client'
+                    profiles.append(Profile(user=user, role=role))
+                    (clients if role == 'client' else staff).append(user.pk)
+                User.objects.bulk_update([u for u in users if u.is_staff], ['is_staff'])
+                Profile.objects.bulk_create(profiles)
+        if not staff:
+            staff = list(User.objects.filter(is_staff=True).values_list('id', flat=True)[:10])
+        if not clients:
+            clients = staff
+        return clients, staff
+
+    def _orders(self, total, clients, staff):
+        rng = self.rng
+        ids = []
+        with _keep_created_at(OrderQueue):
+            for size in _batches(total, self.batch):
+                orders = []
+                for _ in range(size):
+                    created = self._moment()
+                    age = (self.now - created).days
+                    # старые заявки почти все закрыты, свежие — открыты
+                    status = 'done' if rng.random() < min(0.97, age / 14) else rng.choice(OrderQueue.OPEN_STATUSES)
+                    subject = rng.choice(SUBJECTS)
+                    orders.append(OrderQueue(
+                        title=f'{subject.capitalize()} {rng.choice(PROBLEMS)}',
+                        description=f'{subject.capitalize()}: {rng.choice(PROBLEMS)}. {rng.choice(DETAILS)}',
+                        initiator_id=rng.choice(clients),
+                        executor_id=rng.choice(staff) if status != 'new' else None,
+                        status=status,
+                        priority=rng.choices(('low', 'medium', 'high'), weights=(50, 35, 15))[0],
+                        created_at=created,
+                    ))
+                apply_sla(orders)
+                with transaction.atomic():
+                    ids += [o.pk for o in OrderQueue.objects.bulk_create(orders)]
+        return ids
+
+    def _incidents(self, total, order_ids):
+        rng = self.rng
+        for size in _batches(total, self.batch):
+            incidents = []
+            for _ in range(size):
+                detected = self._moment()
+                closed = (self.now - detected).days > 2 and rng.random() < 0.95
+                subject = rng.choice(SERVICES)
+                incidents.append(Incident(
+                    title=f'{subject}: {rng.choice(PROBLEMS)}',
+                    description=f'Мониторинг зафиксировал сбой. {rng.choice(DETAILS)}',
+                    status='Закрыт' if closed else rng.choice(INCIDENT_STATUSES),
+                    criticality=rng.choices(('low', 'medium', 'high'), weights=(55, 35, 10))[0],
+                    detected_at=detected,
+                    closed_at=detected + timedelta(hours=rng.uniform(0.2, 48)) if closed else None,
+                    related_order_id=rng.choice(order_ids) if order_ids and rng.random() < 0.2 else None,
+                ))
+            with transaction.atomic():
+                Incident.objects.bulk_create(incidents)
+
+    def _kpi(self, total):
+        rng = self.rng
+        series = [(metric, service) for metric in METRICS for service in SERVICES]
+        span = (self.now - self.start).total_seconds()
+        for size in _batches(total, self.batch):
+            records = []
+            for _ in range(size):
+                metric, service = rng.choice(series)
+                low, high = METRICS[metric]
+                records.append(KPIRecord(
+                    metric=metric, service_name=service,
+                    value=round(rng.triangular(low, high, low + (high - low) * 0.3), 2),
+                    timestamp=self.start + timedelta(seconds=rng.uniform(0, span)),
+                ))
+            with transaction.atomic():
+                KPIRecord.objects.bulk_create(records)
+
+    def _shifts(self, days, staff):
+        # день и ночь каждый день, на смене по нескольку дежурных
+        rng = self.rng
+        on_duty = staff[:20]
+        shifts = []
+        for day in range(days):
+            date = self.start.date() + timedelta(days=day)
+            for kind in ('day', 'night'):
+                for employee in rng.sample(on_duty, min(3, len(on_duty))):
+                    shifts.append(Shift(
+                        employee_id=employee, date=date, shift=kind,
+                        comment='Плановая смена' if kind == 'day' else 'Ночное дежурство',
+                        phone=f'+7 (900) {rng.randrange(1000):03d}-{rng.randrange(100):02d}-{rng.randrange(100):02d}',
+                    ))
+        with transaction.atomic():
+            Shift.objects.bulk_create(shifts, batch_size=self.batch)
@@ -0,0 +1,15 @@
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from dashboard.changes import prune_changes
+
+class Command(BaseCommand):
+    help = 'Удаляет из журнала изменений события старше CHANGE_LOG_DAYS дней'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHANGE_LOG_DAYS)
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено событий: {deleted}'))
@@ -0,0 +1,20 @@
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Пересчитывает часовые и дневные агрегаты KPI из KPIRecord'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Пересчитать только последние N дней (по умолчанию — всё)')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days'] is not None:
+            since = timezone.now() - timezone.timedelta(days=options['days'])
+        processed = rebuild_rollups(since=since, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Обработано записей KPI: {processed}'))
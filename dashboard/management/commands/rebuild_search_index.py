@@ -0,0 +1,23 @@
+
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+
+from dashboard.models import Document, Incident, OrderQueue
+from dashboard.search import fts_enabled, fts_statements, fts_table, indexed_fields, rebuild_statements
+
+class Command(BaseCommand):
+    help = 'Пересоздаёт полнотекстовый индекс (FTS5) заявок, инцидентов и документов'
+
+    def handle(self, *args, **options):
+        for model in (OrderQueue, Incident, Document):
+            if not fts_enabled(model):
+                self.stdout.write(f'{model.__name__}: не SQLite, индекс FTS5 не используется')
+                continue
+            using = router.db_for_write(model)
+            table = model._meta.db_table
+            fts = fts_table(model)
+            fields = indexed_fields(table)
+            with transaction.atomic(using=using), connections[using].cursor() as cursor:
+                for sql in fts_statements(table, fts, fields) + rebuild_statements(table, fts, fields):
+                    cursor.execute(sql)
+            self.stdout.write(self.style.SUCCESS(f'{model.__name__}: индекс {fts} пересоздан ({model.objects.count()} записей)'))
@@ -0,0 +1,13 @@
+
+from django.core.management.base import BaseCommand
+
+from dashboard.counters import recount
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики сводки панели по таблицам и исправляет расхождения'
+
+    def handle(self, *args, **options):
+        drift = recount()
+        for key, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f'{key}: {stored} -> {actual}')
+        self.stdout.write(self.style.SUCCESS(f'Счётчики сверены, исправлено: {len(drift)}'))
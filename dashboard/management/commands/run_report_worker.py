@@ -0,0 +1,36 @@
+
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard.doctext import extract_pending
+from dashboard.jobs import requeue_stale, run_pending
+
+class Command(BaseCommand):
+    help = 'Фоновый обработчик очереди отчётов и извлечения текста документов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать очередь и завершиться')
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help='Пауза между опросами пустой очереди, сек')
+        parser.add_argument('--stale-after', type=int, default=30,
+                            help='Через сколько минут задание в статусе running считается зависшим')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale(timezone.timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших заданий: {requeued}')
+        try:
+            while True:
+                processed = run_pending()
+                if processed:
+                    self.stdout.write(f'Сформировано отчётов: {processed}')
+                extracted = extract_pending()
+                if extracted:
+                    self.stdout.write(f'Извлечён текст документов: {extracted}')
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
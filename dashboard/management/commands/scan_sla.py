@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard.sla import scan
+
+class Command(BaseCommand):
+    help = 'Ищет заявки с истёкшим или истекающим сроком SLA и записывает события'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--warn-minutes', type=int, default=None,
+                            help='За сколько минут до срока предупреждать (по умолчанию SLA_WARN_MINUTES)')
+        parser.add_argument('--no-incidents', action='store_true',
+                            help='Не заводить инциденты даже для политик с create_incident')
+        parser.add_argument('--every', type=float, default=0,
+                            help='Повторять проход каждые N секунд (0 — один проход)')
+
+    def handle(self, *args, **options):
+        warn_before = None
+        if options['warn_minutes'] is not None:
+            warn_before = timezone.timedelta(minutes=options['warn_minutes'])
+        try:
+            while True:
+                result = scan(warn_before=warn_before, open_incidents=not options['no_incidents'])
+                if any(result.values()) or not options['every']:
+                    self.stdout.write(
+                        f"Нарушений: {result['breach']}, предупреждений: {result['warning']}, "
+                        f"инцидентов: {result['incidents']}"
+                    )
+                if not options['every']:
+                    break
+                time.sleep(options['every'])
+        except KeyboardInterrupt:
+            pass
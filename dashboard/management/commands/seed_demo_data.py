@@ -0,0 +1,11 @@
+
+from django.core.management.base import BaseCommand
+
+from dashboard.seed import seed_demo_data
+
+class Command(BaseCommand):
+    help = 'Заполняет пустые таблицы демо-данными (повторный запуск ничего не меняет)'
+
+    def handle(self, *args, **options):
+        seed_demo_data(force=True)
+        self.stdout.write(self.style.SUCCESS('Демо-данные на месте'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPIRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Час'), ('day', 'День')], max_length=10)),
+                ('bucket', models.DateTimeField()),
+                ('metric', models.CharField(max_length=100)),
+                ('service_name', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('min_value', models.FloatField()),
+                ('max_value', models.FloatField()),
+                ('last_value', models.FloatField()),
+                ('last_timestamp', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'bucket'], name='dashboard_k_period_83133b_idx')],
+                'unique_together': {('period', 'metric', 'service_name', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_kpi_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['detected_at', 'id'], name='dashboard_i_detecte_28dd73_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='kpirecord',
+            index=models.Index(fields=['timestamp', 'id'], name='dashboard_k_timesta_bff826_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='kpirecord',
+            index=models.Index(fields=['metric', 'timestamp', 'id'], name='dashboard_k_metric_6ef759_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderqueue',
+            index=models.Index(fields=['created_at', 'id'], name='dashboard_o_created_fbaa4f_idx'),
+        ),
+    ]
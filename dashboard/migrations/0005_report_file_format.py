@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_report_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='file_format',
+            field=models.CharField(choices=[('docx', 'Word (.docx)'), ('csv', 'CSV')], default='docx', max_length=10),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:04
+
+import hashlib
+from django.db import migrations, models
+
+
+def fill_content_hash(apps, schema_editor):
+    # хеши уже загруженных документов считаются один раз здесь
+    Document = apps.get_model('dashboard', 'Document')
+    for doc in Document.objects.exclude(file=''):
+        digest = hashlib.sha256()
+        try:
+            with doc.file.open('rb') as f:
+                for chunk in f.chunks():
+                    digest.update(chunk)
+        except FileNotFoundError:
+            continue
+        doc.content_hash = digest.hexdigest()
+        doc.save(update_fields=['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_report_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+from dashboard.search import drop_statements, fts_statements, rebuild_statements
+
+# индекс FTS5 есть только в SQLite; на других СУБД поиск работает через icontains
+TABLES = ['dashboard_orderqueue', 'dashboard_incident']
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        fts = f'{table}_fts'
+        for sql in fts_statements(table, fts) + rebuild_statements(table, fts):
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        for sql in drop_statements(f'{table}_fts'):
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_document_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
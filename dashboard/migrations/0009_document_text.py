@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:19
+
+from django.db import migrations, models
+
+from dashboard.search import drop_statements, fts_statements, indexed_fields, rebuild_statements
+
+TABLE = 'dashboard_document'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    fts = f'{TABLE}_fts'
+    fields = indexed_fields(TABLE)
+    for sql in fts_statements(TABLE, fts, fields) + rebuild_statements(TABLE, fts, fields):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in drop_statements(f'{TABLE}_fts'):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='text_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from datetime import timedelta
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+DEFAULT_POLICIES = [
+    ('high', 4, True),
+    ('medium', 8, False),
+    ('low', 24, False),
+]
+
+
+def create_policies(apps, schema_editor):
+    SLAPolicy = apps.get_model('dashboard', 'SLAPolicy')
+    OrderQueue = apps.get_model('dashboard', 'OrderQueue')
+    for priority, hours, create_incident in DEFAULT_POLICIES:
+        SLAPolicy.objects.get_or_create(priority=priority, defaults={
+            'resolve_hours': hours,
+            'create_incident': create_incident,
+        })
+        # заявкам без срока он ставится от даты создания — один UPDATE на приоритет
+        OrderQueue.objects.filter(priority=priority, sla_deadline__isnull=True).update(
+            sla_deadline=F('created_at') + timedelta(hours=hours))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_document_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SLAEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('warning', 'Скоро нарушение'), ('breach', 'Нарушение')], max_length=20)),
+                ('deadline', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SLAPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.CharField(choices=[('low', 'Низкий'), ('medium', 'Средний'), ('high', 'Высокий')], max_length=20, unique=True)),
+                ('resolve_hours', models.PositiveIntegerField()),
+                ('create_incident', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SLAScanState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('warning', 'Скоро нарушение'), ('breach', 'Нарушение')], max_length=20, unique=True)),
+                ('scanned_until', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='orderqueue',
+            index=models.Index(fields=['status', 'sla_deadline'], name='dashboard_o_status_063cc2_idx'),
+        ),
+        migrations.AddField(
+            model_name='slaevent',
+            name='incident',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='dashboard.incident'),
+        ),
+        migrations.AddField(
+            model_name='slaevent',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sla_events', to='dashboard.orderqueue'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='slaevent',
+            unique_together={('order', 'kind', 'deadline')},
+        ),
+        migrations.RunPython(create_policies, migrations.RunPython.noop),
+    ]
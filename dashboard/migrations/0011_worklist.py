@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:24
+
+from django.conf import settings
+from datetime import timedelta
+from django.db import migrations, models
+
+DEFAULT_LEADS = {'high': 120, 'medium': 30, 'low': 0}
+
+
+def fill_urgency(apps, schema_editor):
+    SLAPolicy = apps.get_model('dashboard', 'SLAPolicy')
+    OrderQueue = apps.get_model('dashboard', 'OrderQueue')
+    for priority, lead in DEFAULT_LEADS.items():
+        SLAPolicy.objects.filter(priority=priority).update(worklist_lead_minutes=lead)
+    leads = dict(SLAPolicy.objects.values_list('priority', 'worklist_lead_minutes'))
+    open_orders = OrderQueue.objects.filter(status__in=['new', 'in_progress'], sla_deadline__isnull=False)
+    for order in open_orders.only('id', 'priority', 'sla_deadline'):
+        urgency_at = order.sla_deadline - timedelta(minutes=leads.get(order.priority, 0))
+        OrderQueue.objects.filter(pk=order.pk).update(urgency_at=urgency_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_sla'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderqueue',
+            name='urgency_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='slapolicy',
+            name='worklist_lead_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='orderqueue',
+            index=models.Index(fields=['urgency_at', 'id'], name='dashboard_o_urgency_2e9889_idx'),
+        ),
+        migrations.RunPython(fill_urgency, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:26
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    # начальные значения; дальше счётчики ведут сигналы (см. dashboard.counters)
+    DashboardCounter = apps.get_model('dashboard', 'DashboardCounter')
+    OrderQueue = apps.get_model('dashboard', 'OrderQueue')
+    Incident = apps.get_model('dashboard', 'Incident')
+    KPIRecord = apps.get_model('dashboard', 'KPIRecord')
+    counts = {}
+    for row in OrderQueue.objects.filter(status__in=['new', 'in_progress']).values('status', 'priority').annotate(n=Count('id')):
+        counts[f"orders:{row['status']}:{row['priority']}"] = row['n']
+    for row in Incident.objects.exclude(status='Закрыт').values('criticality').annotate(n=Count('id')):
+        counts[f"incidents:{row['criticality']}"] = row['n']
+    for row in KPIRecord.objects.values('service_name').annotate(n=Count('id')):
+        counts[f"kpi:{row['service_name']}"] = row['n']
+    DashboardCounter.objects.bulk_create([DashboardCounter(key=k, value=v) for k, v in counts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_worklist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=150, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
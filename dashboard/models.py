@@ -1,8 +1,19 @@
 
-from django.db import models
+import hashlib
+import os
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
 
-class OrderQueue(models.Model):
+class AtomicSaveMixin:
+    # запись строки и обработчики post_save (счётчики сводки, версии, журнал
+    # изменений) — одна транзакция: при сбое обработчика откатывается и строка.
+    # post_delete Django и так шлёт внутри транзакции удаления
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+class OrderQueue(AtomicSaveMixin, models.Model):
     STATUS_CHOICES = [
         ('new', 'Новая'),
         ('in_progress', 'В работе'),
@@ -21,20 +32,38 @@ class OrderQueue(models.Model):
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='medium')
     created_at = models.DateTimeField(auto_now_add=True)
     sla_deadline = models.DateTimeField(null=True, blank=True)
+    # порядок в рабочем списке: срок SLA, сдвинутый раньше по приоритету;
+    # у закрытых заявок и заявок без срока — NULL, в индекс они не попадают
+    urgency_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    OPEN_STATUSES = ('new', 'in_progress')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['status', 'sla_deadline']),
+            models.Index(fields=['urgency_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.id} – {self.title}"
 
-class KPIRecord(models.Model):
+class KPIRecord(AtomicSaveMixin, models.Model):
     metric = models.CharField(max_length=100)
     value = models.FloatField()
     timestamp = models.DateTimeField()
     service_name = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['metric', 'timestamp', 'id']),
+        ]
+
     def __str__(self):
         return f"{self.metric} {self.timestamp:%Y-%m-%d}"
 
-class Incident(models.Model):
+class Incident(AtomicSaveMixin, models.Model):
     CRIT_CHOICES = [
         ('low', 'Низкая'),
         ('medium', 'Средняя'),
@@ -48,6 +77,9 @@ class Incident(models.Model):
     closed_at = models.DateTimeField(null=True, blank=True)
     related_order = models.ForeignKey(OrderQueue, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['detected_at', 'id'])]
+
     def __str__(self):
         return self.title
 
@@ -71,12 +103,41 @@ class Report(models.Model):
         ('weekly', 'Недельный отчёт'),
         ('daily', 'Дневной отчёт'),
     ]
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Формируется'),
+        ('done', 'Готов'),
+        ('failed', 'Ошибка'),
+    ]
+    FORMAT_CHOICES = [
+        ('docx', 'Word (.docx)'),
+        ('csv', 'CSV'),
+    ]
     report_type = models.CharField(max_length=50, choices=REPORT_TYPES)
     period_from = models.DateField()
     period_to = models.DateField()
-    file = models.FileField(upload_to='reports/')
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='docx')
+    file = models.FileField(upload_to='reports/', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    data_version = models.PositiveBigIntegerField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['report_type', 'period_from', 'period_to']),
+        ]
+
+    @property
+    def download_name(self):
+        ext = os.path.splitext(self.file.name)[1]
+        return f"report_{self.report_type}_{self.period_from}_{self.period_to}{ext}"
 
     def __str__(self):
         return f"{self.get_report_type_display()} {self.period_from}–{self.period_to}"
@@ -92,6 +153,153 @@ class Document(models.Model):
     description = models.TextField()
     file = models.FileField(upload_to='docs/')
     access = models.CharField(max_length=20, choices=ACCESS_CHOICES, default='public')
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # текст файла для поиска; text_hash — хеш файла, из которого он извлечён
+    text = models.TextField(blank=True, editable=False)
+    text_hash = models.CharField(max_length=64, blank=True, editable=False)
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        # хеш считается один раз при загрузке файла и служит ETag при скачивании
+        if self.file and (not self.file._committed or not self.content_hash):
+            digest = hashlib.sha256()
+            try:
+                for chunk in self.file.chunks():
+                    digest.update(chunk)
+            except FileNotFoundError:
+                pass
+            else:
+                self.content_hash = digest.hexdigest()
+            if self.file._committed:
+                self.file.close()
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def access_levels(role):
+        if role in ('admin', 'manager'):
+            return ['public', 'client', 'internal']
+        if role == 'client':
+            return ['public', 'client']
+        return ['public']
+
+    @property
+    def download_name(self):
+        return os.path.basename(self.file.name)
+
+class KPIRollup(models.Model):
+    PERIOD_CHOICES = [
+        ('hour', 'Час'),
+        ('day', 'День'),
+    ]
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField()
+    metric = models.CharField(max_length=100)
+    service_name = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    min_value = models.FloatField()
+    max_value = models.FloatField()
+    last_value = models.FloatField()
+    last_timestamp = models.DateTimeField()
+
+    class Meta:
+        unique_together = [('period', 'metric', 'service_name', 'bucket')]
+        indexes = [models.Index(fields=['period', 'bucket'])]
+
+    @property
+    def avg_value(self):
+        return self.total / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.metric} {self.period} {self.bucket:%Y-%m-%d %H:%M}"
+
+class DataDayVersion(models.Model):
+    # счётчик изменений заявок, инцидентов и KPI за календарный день
+    day = models.DateField(unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} v{self.version}"
+
+class ModelVersion(models.Model):
+    # версия таблицы для кеша страниц, ETag и проверки отставания реплики —
+    # метка времени (нс) последнего изменения. Хранится в базе, а не в кеше
+    # Django, чтобы записи из run_report_worker и scan_sla видели все процессы
+    label = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+class SLAPolicy(models.Model):
+    # срок решения заявки по приоритету; по нему при создании ставится sla_deadline
+    priority = models.CharField(max_length=20, choices=OrderQueue.PRIORITY_CHOICES, unique=True)
+    resolve_hours = models.PositiveIntegerField()
+    create_incident = models.BooleanField(default=False)
+    # вес приоритета в рабочем списке: заявка встаёт в него как будто её срок
+    # наступает на столько минут раньше
+    worklist_lead_minutes = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.get_priority_display()}: {self.resolve_hours} ч"
+
+class SLAEvent(models.Model):
+    KIND_CHOICES = [
+        ('warning', 'Скоро нарушение'),
+        ('breach', 'Нарушение'),
+    ]
+    order = models.ForeignKey(OrderQueue, on_delete=models.CASCADE, related_name='sla_events')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # срок, к которому относится событие: после его изменения событие может повториться
+    deadline = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    incident = models.ForeignKey(Incident, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        unique_together = [('order', 'kind', 'deadline')]
+
+    def __str__(self):
+        return f"{self.order_id} {self.kind} {self.deadline:%Y-%m-%d %H:%M}"
+
+class SLAScanState(models.Model):
+    # до какого срока просмотрены заявки: следующий проход читает только новый отрезок
+    kind = models.CharField(max_length=20, choices=SLAEvent.KIND_CHOICES, unique=True)
+    scanned_until = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.kind} {self.scanned_until:%Y-%m-%d %H:%M}"
+
+class DashboardCounter(models.Model):
+    # счётчики сводки панели: orders:<статус>:<приоритет>, incidents:<критичность>,
+    # kpi:<сервис>; поддерживаются сигналами, сверяются командой recount
+    key = models.CharField(max_length=150, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
+
+class ChangeEvent(models.Model):
+    # журнал изменений заявок и инцидентов для живого обновления списков (SSE):
+    # только дополняется, номер события — id; старые записи удаляет prune_changes
+    TOPIC_CHOICES = [
+        ('order', 'Заявка'),
+        ('incident', 'Инцидент'),
+    ]
+    ACTION_CHOICES = [
+        ('created', 'Создание'),
+        ('updated', 'Изменение'),
+        ('deleted', 'Удаление'),
+        ('bulk', 'Массовая правка'),
+    ]
+    topic = models.CharField(max_length=20, choices=TOPIC_CHOICES)
+    # у массовой правки — 0, список id лежит в data
+    object_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    # поля строки списка в готовом для показа виде
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.topic} {self.object_id} {self.action}"
@@ -0,0 +1,53 @@
+
+import base64
+import json
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+MAX_PAGE_SIZE = 1000
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Некорректный курсор')
+    if value is None:
+        raise InvalidCursor('Некорректный курсор')
+    return value, pk
+
+def page_size(raw, default):
+    try:
+        size = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def keyset_page(qs, field, cursor=None, size=20, descending=False):
+    # страница по (field, id): стоимость не зависит от номера страницы, в отличие от OFFSET
+    if descending:
+        qs = qs.order_by(f'-{field}', '-id')
+    else:
+        qs = qs.order_by(field, 'id')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        if descending:
+            qs = qs.filter(Q(**{f'{field}__lte': value}), Q(**{f'{field}__lt': value}) | Q(id__lt=pk))
+        else:
+            qs = qs.filter(Q(**{f'{field}__gte': value}), Q(**{f'{field}__gt': value}) | Q(id__gt=pk))
+    items = list(qs[:size + 1])
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return items, next_cursor
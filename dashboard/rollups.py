@@ -0,0 +1,184 @@
+
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum, Min, Max, Case, When, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from .models import KPIRecord, KPIRollup
+from .versions import bump_models
+
+PERIODS = ('hour', 'day')
+
+# Диапазоны длиннее порога читаются из агрегатов, а не из сырых KPIRecord
+RAW_MAX_SPAN = timedelta(days=2)
+HOUR_MAX_SPAN = timedelta(days=14)
+
+def bucket_start(ts, period):
+    if timezone.is_naive(ts):
+        ts = timezone.make_aware(ts)
+    local = timezone.localtime(ts)
+    if period == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def choose_period(span):
+    if span <= RAW_MAX_SPAN:
+        return None
+    if span <= HOUR_MAX_SPAN:
+        return 'hour'
+    return 'day'
+
+def add_records(records):
+    # сначала сворачиваем пачку в памяти, затем одно обновление на корзину
+    deltas = {}
+    for rec in records:
+        # целое значение (value=5) смешало бы типы в Least/Greatest обновления
+        value = float(rec.value)
+        for period in PERIODS:
+            key = (period, bucket_start(rec.timestamp, period), rec.metric, rec.service_name)
+            d = deltas.get(key)
+            if d is None:
+                deltas[key] = d = {
+                    'count': 0, 'total': 0.0,
+                    'min': value, 'max': value,
+                    'last': value, 'last_ts': rec.timestamp,
+                }
+            d['count'] += 1
+            d['total'] += value
+            d['min'] = min(d['min'], value)
+            d['max'] = max(d['max'], value)
+            if rec.timestamp >= d['last_ts']:
+                d['last'] = value
+                d['last_ts'] = rec.timestamp
+    if not deltas:
+        return
+    with transaction.atomic():
+        # какие корзины уже есть — выборкой по точным ключам; новые создаются одной вставкой
+        existing = _existing(list(deltas))
+        new = [key for key in deltas if key not in existing]
+        try:
+            if new:
+                with transaction.atomic():
+                    KPIRollup.objects.bulk_create([_new_rollup(key, deltas[key]) for key in new])
+        except IntegrityError:
+            # корзину одновременно создал параллельный приём — сливаем по одной
+            for key, d in deltas.items():
+                _merge(key, d)
+            return
+        for key in deltas.keys() & existing:
+            _update(key, deltas[key])
+
+EXISTING_CHUNK = 500
+
+def _existing(keys):
+    # условие — точные корзины каждой пары метрика/сервис, а не диапазон дат:
+    # пачка за длинный период не тянет чужие агрегаты. Один запрос на EXISTING_CHUNK
+    # корзин, чтобы не упереться в предел параметров SQLite
+    found = set()
+    for start in range(0, len(keys), EXISTING_CHUNK):
+        groups = {}
+        for period, bucket, metric, service_name in keys[start:start + EXISTING_CHUNK]:
+            groups.setdefault((period, metric, service_name), []).append(bucket)
+        cond = Q()
+        for (period, metric, service_name), buckets in groups.items():
+            cond |= Q(period=period, metric=metric, service_name=service_name, bucket__in=buckets)
+        found.update(KPIRollup.objects.filter(cond).values_list('period', 'bucket', 'metric', 'service_name'))
+    return found
+
+def _new_rollup(key, d):
+    period, bucket, metric, service_name = key
+    return KPIRollup(
+        period=period, bucket=bucket, metric=metric, service_name=service_name,
+        count=d['count'], total=d['total'], min_value=d['min'], max_value=d['max'],
+        last_value=d['last'], last_timestamp=d['last_ts'],
+    )
+
+def _merge(key, d):
+    period, bucket, metric, service_name = key
+    row, created = KPIRollup.objects.get_or_create(
+        period=period, bucket=bucket, metric=metric, service_name=service_name,
+        defaults={
+            'count': d['count'],
+            'total': d['total'],
+            'min_value': d['min'],
+            'max_value': d['max'],
+            'last_value': d['last'],
+            'last_timestamp': d['last_ts'],
+        },
+    )
+    if not created:
+        _update(key, d)
+
+def _update(key, d):
+    period, bucket, metric, service_name = key
+    KPIRollup.objects.filter(period=period, bucket=bucket, metric=metric, service_name=service_name).update(
+        count=F('count') + d['count'],
+        total=F('total') + d['total'],
+        min_value=Least('min_value', Value(d['min'])),
+        max_value=Greatest('max_value', Value(d['max'])),
+        last_value=Case(
+            When(last_timestamp__lte=d['last_ts'], then=Value(d['last'])),
+            default=F('last_value'),
+        ),
+        last_timestamp=Greatest('last_timestamp', Value(d['last_ts'])),
+    )
+
+def rebuild_rollups(since=None, chunk_size=5000):
+    rollups = KPIRollup.objects.all()
+    records = KPIRecord.objects.only('metric', 'value', 'timestamp', 'service_name').order_by('timestamp', 'id')
+    if since is not None:
+        # границу выравниваем на сутки, чтобы не получить неполные корзины
+        since = bucket_start(since, 'day')
+        rollups = rollups.filter(bucket__gte=since)
+        records = records.filter(timestamp__gte=since)
+    processed = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for rec in records.iterator(chunk_size=chunk_size):
+            batch.append(rec)
+            if len(batch) >= chunk_size:
+                add_records(batch)
+                processed += len(batch)
+                batch = []
+        if batch:
+            add_records(batch)
+            processed += len(batch)
+        bump_models(KPIRecord)
+    return processed
+
+# ряды [{metric, service_name, data: [{timestamp, value, min, max}]}] — по одному
+# на пару метрика/сервис, чтобы точки разных сервисов не смешивались;
+# period=None — сырые записи
+def kpi_series(since, period=None, metric=None):
+    series = {}
+    if period is None:
+        qs = KPIRecord.objects.filter(timestamp__gte=since).order_by('timestamp', 'id')
+        if metric:
+            qs = qs.filter(metric=metric)
+        for m, service, ts, value in qs.values_list('metric', 'service_name', 'timestamp', 'value'):
+            series.setdefault((m, service), []).append({
+                'timestamp': ts.isoformat(),
+                'value': value,
+                'min': value,
+                'max': value,
+            })
+        return _series_list(series)
+    qs = KPIRollup.objects.filter(period=period, bucket__gte=bucket_start(since, period))
+    if metric:
+        qs = qs.filter(metric=metric)
+    rows = qs.values('metric', 'service_name', 'bucket').annotate(
+        n=Sum('count'), s=Sum('total'), lo=Min('min_value'), hi=Max('max_value'),
+    ).order_by('metric', 'service_name', 'bucket')
+    for row in rows:
+        series.setdefault((row['metric'], row['service_name']), []).append({
+            'timestamp': row['bucket'].isoformat(),
+            'value': row['s'] / row['n'] if row['n'] else None,
+            'min': row['lo'],
+            'max': row['hi'],
+        })
+    return _series_list(series)
+
+def _series_list(series):
+    return [{'metric': m, 'service_name': service, 'data': data} for (m, service), data in sorted(series.items())]
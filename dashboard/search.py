@@ -0,0 +1,124 @@
+
+import re
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# Полнотекстовый поиск по заявкам, инцидентам и документам: внешний индекс FTS5
+# (SQLite), синхронизируется триггерами — в том числе при bulk_create и update().
+# На других СУБД — запасной вариант через icontains.
+
+SEARCH_FIELDS = ('title', 'description')
+# поля индекса по таблицам (по умолчанию SEARCH_FIELDS); первое — заголовок
+INDEXED_FIELDS = {
+    'dashboard_document': ('title', 'description', 'text'),
+}
+MAX_TERMS = 8
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+# вес совпадений в заголовке выше, чем в описании
+TITLE_WEIGHT = 10.0
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+def indexed_fields(table):
+    return INDEXED_FIELDS.get(table, SEARCH_FIELDS)
+
+def _fold(sql):
+    # unicode61 не приравнивает «ё» к «е»: нормализуем и индекс, и запрос
+    return f"replace(replace({sql}, 'ё', 'е'), 'Ё', 'Е')"
+
+def fts_statements(table, fts, fields=SEARCH_FIELDS):
+    # unicode61 приводит кириллицу к нижнему регистру; prefix-индексы ускоряют
+    # поиск по началу слова, которым запрос заменяет морфологию
+    cols = ', '.join(fields)
+    new = ', '.join(_fold(f'new.{f}') for f in fields)
+    old = ', '.join(_fold(f'old.{f}') for f in fields)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+def drop_statements(fts):
+    return [f'DROP TRIGGER IF EXISTS {fts}_{suffix}' for suffix in ('ai', 'ad', 'au')] + [f'DROP TABLE IF EXISTS {fts}']
+
+def rebuild_statements(table, fts, fields=SEARCH_FIELDS):
+    # 'rebuild' прочитал бы исходный текст без нормализации «ё», поэтому заполняем сами
+    cols = ', '.join(fields)
+    values = ', '.join(_fold(f) for f in fields)
+    return [
+        f"INSERT INTO {fts}({fts}) VALUES ('delete-all')",
+        f"INSERT INTO {fts}(rowid, {cols}) SELECT id, {values} FROM {table}",
+        f"INSERT INTO {fts}({fts}) VALUES ('optimize')",
+    ]
+
+def fts_enabled(model):
+    return connections[router.db_for_read(model)].vendor == 'sqlite'
+
+# русских стеммеров в FTS5 нет: у слова из запроса отрезается окончание,
+# а основа ищется как префикс («почта» найдёт «почты», «почтой»)
+RU_ENDINGS = sorted([
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ой', 'ей', 'ий', 'ый',
+    'ая', 'яя', 'ое', 'ее', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ом', 'ем', 'ую', 'юю',
+    'ых', 'их', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+], key=len, reverse=True)
+MIN_STEM = 4
+CYRILLIC_RE = re.compile(r'^[а-я]+$')
+
+def _stem(term):
+    if CYRILLIC_RE.match(term):
+        for ending in RU_ENDINGS:
+            if term.endswith(ending) and len(term) - len(ending) >= MIN_STEM:
+                return term[:-len(ending)]
+    return term
+
+def search_terms(q):
+    terms = re.findall(r'\w+', (q or '').lower().replace('ё', 'е'))[:MAX_TERMS]
+    return [_stem(t) for t in terms]
+
+def match_expression(terms):
+    # каждое слово — префикс в кавычках: операторы FTS5 из ввода не исполняются
+    return ' '.join(f'"{t}"*' for t in terms)
+
+def search(qs, q):
+    # queryset, отсортированный по релевантности; у объектов — search_snippet
+    terms = search_terms(q)
+    if not terms:
+        return qs.none()
+    model = qs.model
+    table = model._meta.db_table
+    fields = indexed_fields(table)
+    if not fts_enabled(model):
+        for term in terms:
+            match = Q()
+            for field in fields:
+                match |= Q(**{f'{field}__icontains': term})
+            qs = qs.filter(match)
+        return qs.extra(select={'search_snippet': 'NULL'}).order_by('-id')
+    fts = fts_table(model)
+    weights = ', '.join([str(TITLE_WEIGHT)] + ['1.0'] * (len(fields) - 1))
+    return qs.extra(
+        select={
+            'search_rank': f'bm25({fts}, {weights})',
+            'search_snippet': f"snippet({fts}, -1, char(2), char(3), '…', 16)",
+        },
+        tables=[fts],
+        where=[f'{fts}.rowid = {table}.id', f'{fts} MATCH %s'],
+        params=[match_expression(terms)],
+    ).order_by('search_rank', '-id')
+
+def highlight(snippet):
+    # совпадения в <mark>, остальной текст экранируется
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+    return mark_safe(html)
@@ -0,0 +1,171 @@
+
+import os
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OrderQueue, KPIRecord, Incident, Shift, Document
+
+# Демо-данные создаются один раз: командой seed_demo_data или после migrate.
+# Флаг не даёт повторно проверять таблицы в рамках одного процесса.
+_seeded = False
+
+def seed_demo_data(force=False):
+    global _seeded
+    if _seeded and not force:
+        return False
+    with transaction.atomic():
+        _seed()
+    _seeded = True
+    return True
+
+def _seed():
+    # пользователи для связей
+    users = {u.username: u for u in User.objects.filter(username__in=['admin', 'manager', 'client'])}
+    admin = users.get('admin')
+    manager = users.get('manager')
+    client = users.get('client')
+
+    # Очередь заявок
+    if not OrderQueue.objects.exists() and client:
+        OrderQueue.objects.create(
+            title='Недоступен портал клиентов',
+            description='Пользователи сообщают о недоступности портала авторизации.',
+            initiator=client,
+            executor=manager or admin,
+            status='in_progress',
+            priority='high',
+            sla_deadline=timezone.now() + timezone.timedelta(hours=4),
+        )
+        OrderQueue.objects.create(
+            title='Ошибка при формировании отчёта',
+            description='При генерации отчёта за месяц появляется сообщение об ошибке.',
+            initiator=client,
+            executor=manager or admin,
+            status='new',
+            priority='medium',
+            sla_deadline=timezone.now() + timezone.timedelta(hours=8),
+        )
+        OrderQueue.objects.create(
+            title='Уточнение прав доступа',
+            description='Необходимо выдать права на просмотр отчётов для нового сотрудника.',
+            initiator=client,
+            executor=manager or admin,
+            status='done',
+            priority='low',
+            sla_deadline=timezone.now() - timezone.timedelta(hours=1),
+        )
+
+    # KPI
+    if not KPIRecord.objects.exists():
+        base = timezone.now()
+        for i in range(7):
+            day = base - timezone.timedelta(days=i)
+            KPIRecord.objects.create(
+                metric='Среднее время решения',
+                value=4.0 - i * 0.2,
+                timestamp=day,
+                service_name='Портал клиентов',
+            )
+            KPIRecord.objects.create(
+                metric='Доступность сервиса',
+                value=99.0 + i * 0.1,
+                timestamp=day,
+                service_name='Система биллинга',
+            )
+
+    # Инциденты
+    if not Incident.objects.exists():
+        Incident.objects.create(
+            title='Снижение скорости обработки запросов',
+            description='Зафиксировано увеличение времени отклика портала клиентов.',
+            status='В работе',
+            criticality='medium',
+            detected_at=timezone.now() - timezone.timedelta(hours=3),
+            related_order=OrderQueue.objects.first(),
+        )
+        Incident.objects.create(
+            title='Кратковременная недоступность биллинга',
+            description='Пользователи не могли формировать счета в течение 10 минут.',
+            status='Закрыт',
+            criticality='high',
+            detected_at=timezone.now() - timezone.timedelta(days=1, hours=2),
+            closed_at=timezone.now() - timezone.timedelta(days=1),
+        )
+
+    # Смены
+    if not Shift.objects.exists() and (admin or manager):
+        base_date = timezone.now().date()
+        for i in range(5):
+            Shift.objects.create(
+                employee=manager or admin,
+                date=base_date + timezone.timedelta(days=i),
+                shift='day',
+                comment='Плановая дневная смена',
+                phone='+7 (900) 000-00-01',
+            )
+        Shift.objects.create(
+            employee=admin or manager,
+            date=base_date,
+            shift='night',
+            comment='Ночная смена дежурного инженера',
+            phone='+7 (900) 000-00-02',
+        )
+
+    # Документы
+    if not Document.objects.exists():
+        docs_dir = settings.MEDIA_ROOT / 'docs'
+        os.makedirs(docs_dir, exist_ok=True)
+        try:
+            from docx import Document as DocxDocument
+            def make_doc(filename, title_text, body_text):
+                full_path = docs_dir / filename
+                # файл уже есть (в репозитории или от прошлой базы, в том числе
+                # тестовой) — не перезаписываем
+                if full_path.exists():
+                    return
+                doc = DocxDocument()
+                doc.add_heading(title_text, level=1)
+                doc.add_paragraph(body_text)
+                doc.save(full_path)
+            make_doc('reglament_incidents.docx', 'Регламент обработки инцидентов',
+                     'Документ описывает порядок регистрации, классификации и эскалации инцидентов.')
+            make_doc('reglament_shifts.docx', 'Регламент организации смен',
+                     'Документ фиксирует правила формирования графика смен и обязанности дежурного персонала.')
+            make_doc('instruction_portal.docx', 'Инструкция пользователя портала',
+                     'Инструкция по работе с порталом и отслеживанию статусов обращений.')
+        except Exception:
+            # резервный вариант: текстовые файлы
+            def make_txt(filename, body_text):
+                full_path = docs_dir / filename
+                with open(full_path, 'w', encoding='utf8') as f:
+                    f.write(body_text)
+            make_txt('reglament_incidents.txt', 'Регламент обработки инцидентов.')
+            make_txt('reglament_shifts.txt', 'Регламент организации смен.')
+            make_txt('instruction_portal.txt', 'Инструкция пользователя портала.')
+
+        # создать записи в БД
+        for fname, title, desc in [
+            ('reglament_incidents.docx', 'Регламент обработки инцидентов', 'Порядок регистрации и сопровождения инцидентов.'),
+            ('reglament_shifts.docx', 'Регламент организации смен', 'Описание процедуры планирования смен и ответственности.'),
+            ('instruction_portal.docx', 'Инструкция пользователя портала', 'Руководство по работе с порталом для клиентов.'),
+        ]:
+            # если docx не создан, пробуем txt
+            path_docx = docs_dir / fname
+            path_txt = docs_dir / fname.replace('.docx', '.txt')
+            if path_docx.exists():
+                rel = f'docs/{fname}'
+            elif path_txt.exists():
+                rel = f'docs/{path_txt.name}'
+            else:
+                continue
+            Document.objects.get_or_create(
+                slug=fname.split('.')[0],
+                defaults={
+                    'title': title,
+                    'description': desc,
+                    'file': rel,
+                    'access': 'public',
+                }
+            )
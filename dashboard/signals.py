@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .changes import record_change
+from .counters import adjust, key_for, stored_key
+from .models import Incident, KPIRecord, OrderQueue, Report, Shift, SLAPolicy
+from .rollups import add_records
+from .seed import seed_demo_data
+from .sla import clear_policy_cache, deadline_for, recheck, refresh_urgency, urgency_for
+from .versions import bump_days, bump_models, day_of
+
+def seed_after_migrate(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    if using != DEFAULT_DB_ALIAS or not getattr(settings, 'SEED_DEMO_DATA', True):
+        return
+    seed_demo_data()
+
+@receiver(post_save, sender=KPIRecord)
+def update_kpi_rollups(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        add_records([instance])
+
+# поле даты, по которому запись попадает в период отчёта
+PERIOD_FIELDS = {
+    OrderQueue: 'created_at',
+    Incident: 'detected_at',
+    KPIRecord: 'timestamp',
+}
+
+@receiver(post_save, sender=OrderQueue)
+@receiver(post_save, sender=Incident)
+@receiver(post_save, sender=KPIRecord)
+@receiver(post_delete, sender=OrderQueue)
+@receiver(post_delete, sender=Incident)
+@receiver(post_delete, sender=KPIRecord)
+def bump_data_version(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ts = getattr(instance, PERIOD_FIELDS[sender])
+    if ts is not None:
+        bump_days([day_of(ts)])
+
+# кеш публичных страниц (core.pagecache) сбрасывается сменой версии таблицы
+@receiver(post_save, sender=OrderQueue)
+@receiver(post_save, sender=Incident)
+@receiver(post_save, sender=KPIRecord)
+@receiver(post_save, sender=Shift)
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=OrderQueue)
+@receiver(post_delete, sender=Incident)
+@receiver(post_delete, sender=KPIRecord)
+@receiver(post_delete, sender=Shift)
+@receiver(post_delete, sender=Report)
+def bump_model_version(sender, **kwargs):
+    bump_models(sender)
+
+@receiver(pre_save, sender=OrderQueue)
+def set_sla_deadline(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # срок по политике SLA — только для новой заявки без явно заданного срока
+    if instance._state.adding and instance.sla_deadline is None:
+        instance.sla_deadline = deadline_for(instance.priority, instance.created_at or timezone.now())
+    # место в рабочем списке зависит от статуса, приоритета и срока — пересчитываем всегда
+    instance.urgency_at = urgency_for(instance)
+
+@receiver(post_save, sender=OrderQueue)
+def recheck_sla(sender, instance, raw=False, **kwargs):
+    # сканер идёт по срокам вперёд: заявку, открытую заново после срока или со
+    # сроком, перенесённым в пройденный отрезок, проверяем сразу. Дальние сроки
+    # дождутся обычного прохода — без лишних запросов
+    if raw or instance.status not in OrderQueue.OPEN_STATUSES or instance.sla_deadline is None:
+        return
+    if instance.sla_deadline <= timezone.now() + timezone.timedelta(minutes=settings.SLA_WARN_MINUTES):
+        recheck(OrderQueue.objects.filter(pk=instance.pk))
+
+@receiver(post_save, sender=SLAPolicy)
+@receiver(post_delete, sender=SLAPolicy)
+def reset_sla_policies(sender, instance, **kwargs):
+    # в этом процессе — сразу, в остальных — по новой версии после коммита
+    clear_policy_cache()
+    bump_models(sender)
+    refresh_urgency(instance.priority)
+
+# счётчики сводки: ключ до сохранения запоминается в pre_save, после — сдвигается на ±1
+@receiver(pre_save, sender=OrderQueue)
+@receiver(pre_save, sender=Incident)
+@receiver(pre_save, sender=KPIRecord)
+def remember_counter_key(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._counter_key = None if instance._state.adding else stored_key(sender, instance.pk)
+
+@receiver(post_save, sender=OrderQueue)
+@receiver(post_save, sender=Incident)
+@receiver(post_save, sender=KPIRecord)
+def update_counters(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old, new = getattr(instance, '_counter_key', None), key_for(instance)
+    if old != new:
+        adjust({old: -1, new: 1})
+
+@receiver(post_delete, sender=OrderQueue)
+@receiver(post_delete, sender=Incident)
+@receiver(post_delete, sender=KPIRecord)
+def decrement_counters(sender, instance, **kwargs):
+    adjust({key_for(instance): -1})
+
+# журнал изменений для живого обновления списков (dashboard.changes)
+@receiver(post_save, sender=OrderQueue)
+@receiver(post_save, sender=Incident)
+def log_change(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record_change(instance, 'created' if created else 'updated')
+
+@receiver(post_delete, sender=OrderQueue)
+@receiver(post_delete, sender=Incident)
+def log_deletion(sender, instance, **kwargs):
+    record_change(instance, 'deleted')
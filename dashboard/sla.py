@@ -0,0 +1,146 @@
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import Incident, OrderQueue, SLAEvent, SLAPolicy, SLAScanState
+from .versions import bump_models, model_versions
+
+# Срок решения заявки ставится при создании по таблице SLAPolicy. Сканер читает
+# индекс (status, sla_deadline) только на отрезке сроков после прошлого прохода,
+# поэтому стоимость прохода — O(log n + k), где k — число новых событий.
+
+POLICY_CACHE_KEY = 'sla-policies'
+
+def policies():
+    # кеш процесса сверяется с версией таблицы в базе: политику могли изменить
+    # в другом процессе (панель, scan_sla, run_report_worker)
+    version = model_versions(SLAPolicy)[0]
+    cached = cache.get(POLICY_CACHE_KEY)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    data = {p.priority: {
+        'hours': p.resolve_hours,
+        'incident': p.create_incident,
+        'lead': p.worklist_lead_minutes,
+    } for p in SLAPolicy.objects.all()}
+    cache.set(POLICY_CACHE_KEY, (version, data), timeout=None)
+    return data
+
+def clear_policy_cache():
+    cache.delete(POLICY_CACHE_KEY)
+
+def deadline_for(priority, start):
+    policy = policies().get(priority)
+    if policy is None:
+        return None
+    return start + timedelta(hours=policy['hours'])
+
+def urgency_for(order):
+    if order.status not in OrderQueue.OPEN_STATUSES or order.sla_deadline is None:
+        return None
+    lead = policies().get(order.priority, {}).get('lead', 0)
+    return order.sla_deadline - timedelta(minutes=lead)
+
+def apply_sla(orders, start=None):
+    # для bulk_create и bulk_update, которые не вызывают pre_save
+    start = start or timezone.now()
+    for order in orders:
+        if order.sla_deadline is None:
+            order.sla_deadline = deadline_for(order.priority, order.created_at or start)
+        order.urgency_at = urgency_for(order)
+    return orders
+
+def refresh_urgency(priority, qs=None):
+    # после изменения политики или массовой правки: пересчёт одним UPDATE
+    # по открытым заявкам приоритета. update() сигналов не шлёт — версию таблицы
+    # (ETag рабочего списка, выбор реплики) меняем сами
+    qs = OrderQueue.objects.all() if qs is None else qs
+    lead = policies().get(priority, {}).get('lead', 0)
+    updated = qs.filter(
+        priority=priority, status__in=OrderQueue.OPEN_STATUSES, sla_deadline__isnull=False,
+    ).update(urgency_at=F('sla_deadline') - timedelta(minutes=lead))
+    if updated:
+        bump_models(OrderQueue)
+    return updated
+
+def worklist(qs):
+    # открытые заявки по срочности; сортировку даёт индекс (urgency_at, id)
+    return qs.filter(urgency_at__isnull=False).order_by('urgency_at', 'id')
+
+def due_orders(since, until):
+    qs = OrderQueue.objects.filter(status__in=OrderQueue.OPEN_STATUSES, sla_deadline__lte=until)
+    if since is not None:
+        qs = qs.filter(sla_deadline__gt=since)
+    return qs.order_by('sla_deadline', 'id')
+
+def _open_incident(order):
+    return Incident.objects.create(
+        title=f'Нарушен SLA заявки #{order.pk}',
+        description=f'Срок решения заявки «{order.title}» истёк {timezone.localtime(order.sla_deadline):%d.%m.%Y %H:%M}.',
+        status='Открыт',
+        criticality=order.priority,
+        detected_at=timezone.now(),
+        related_order=order,
+    )
+
+def _record(order, kind, open_incidents):
+    # уникальность (order, kind, deadline) защищает от повторов при параллельных проходах
+    try:
+        with transaction.atomic():
+            event = SLAEvent.objects.create(order=order, kind=kind, deadline=order.sla_deadline)
+    except IntegrityError:
+        return None
+    if kind == 'breach' and open_incidents and policies().get(order.priority, {}).get('incident'):
+        event.incident = _open_incident(order)
+        event.save(update_fields=['incident'])
+    return event
+
+def recheck(qs, now=None, warn_before=None):
+    # заявки, вернувшиеся в работу или получившие срок внутри уже просканированного
+    # отрезка: очередной проход их не увидит — события пишутся сразу
+    now = now or timezone.now()
+    if warn_before is None:
+        warn_before = timedelta(minutes=settings.SLA_WARN_MINUTES)
+    marks = dict(SLAScanState.objects.values_list('kind', 'scanned_until'))
+    qs = qs.filter(status__in=OrderQueue.OPEN_STATUSES, sla_deadline__isnull=False)
+    result = {'breach': 0, 'warning': 0, 'incidents': 0}
+    for kind, since in (('breach', None), ('warning', now)):
+        until = marks.get(kind)
+        if until is None:
+            continue
+        due = qs.filter(sla_deadline__lte=min(until, now + warn_before))
+        if since is not None:
+            # истёкший срок — уже нарушение, предупреждать поздно
+            due = due.filter(sla_deadline__gt=since)
+        recorded = SLAEvent.objects.filter(order=OuterRef('pk'), kind=kind, deadline=OuterRef('sla_deadline'))
+        for order in due.filter(~Exists(recorded)).only('id', 'title', 'priority', 'sla_deadline'):
+            event = _record(order, kind, True)
+            if event is not None:
+                result[kind] += 1
+                result['incidents'] += event.incident_id is not None
+    return result
+
+def scan(now=None, warn_before=None, open_incidents=True):
+    now = now or timezone.now()
+    if warn_before is None:
+        warn_before = timedelta(minutes=settings.SLA_WARN_MINUTES)
+    result = {'breach': 0, 'warning': 0, 'incidents': 0}
+    for kind, until in (('breach', now), ('warning', now + warn_before)):
+        with transaction.atomic():
+            state = SLAScanState.objects.select_for_update().filter(kind=kind).first()
+            since = state.scanned_until if state else None
+            if kind == 'warning' and (since is None or since < now):
+                # о сроках, которые уже прошли, предупреждать поздно
+                since = now
+            if since is None or since < until:
+                for order in due_orders(since, until).only('id', 'title', 'priority', 'sla_deadline'):
+                    event = _record(order, kind, open_incidents)
+                    if event is not None:
+                        result[kind] += 1
+                        result['incidents'] += event.incident_id is not None
+            SLAScanState.objects.update_or_create(kind=kind, defaults={'scanned_until': max(until, since or until)})
+    return result
@@ -0,0 +1,463 @@
+
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+
+from accounts.models import Profile
+from project.routers import PIN_COOKIE, ReplicaPinMiddleware, ReplicaRouter, routing_state
+
+from .bulk import BulkError, bulk_update_orders, parse_changes
+from .counters import recount
+from .downsample import lttb, minmax
+from .models import Document, Incident, KPIRecord, KPIRollup, OrderQueue, Report, Shift, SLAEvent, SLAPolicy
+from .pagination import InvalidCursor, keyset_page
+from .rollups import add_records, bucket_start, rebuild_rollups
+from .sla import apply_sla, scan
+
+# Бюджет SQL-запросов на каждое представление. Все адреса замеряются при 10 и
+# при 1000 строках в каждой таблице: число запросов не должно расти вместе с
+# данными (N+1) и не должно превышать бюджет. При провале печатаются сами запросы.
+
+ROWS = (10, 1000)
+MEDIA_ROOT = tempfile.mkdtemp(prefix='bazis-tests-')
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class QueryBudgetTestCase(TestCase):
+    # общая часть: наполнение таблиц и замер; тестов в самом классе нет,
+    # наследники перечисляют адреса в budgets()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.rows = 0
+        self.now = timezone.now()
+        self.admin = self.make_user('budget-admin', 'admin')
+        self.client_user = self.make_user('budget-client', 'client')
+        self.clients = {'anon': Client(), 'staff': Client(), 'client': Client()}
+        self.clients['staff'].force_login(self.admin)
+        self.clients['client'].force_login(self.client_user)
+        self.order = OrderQueue.objects.create(title='Заявка для проверки', description='Портал не открывается',
+                                               initiator=self.client_user, executor=self.admin)
+        self.report = Report(report_type='daily', period_from=self.now.date(), period_to=self.now.date(),
+                             author=self.admin, status='done', content_hash='budget')
+        self.report.file.save('budget.csv', ContentFile(b'metric;value\n'))
+        self.document = Document(title='Регламент', slug='budget-document', description='Регламент работ', access='public')
+        self.document.file.save('budget.txt', ContentFile('регламент работ'.encode('utf-8')))
+
+    def make_user(self, username, role):
+        # без пароля: force_login он не нужен, а хеширование медленное
+        user = User.objects.create(username=username, is_staff=role != 'client')
+        Profile.objects.create(user=user, role=role)
+        return user
+
+    def fill(self, rows):
+        # дополняет каждую таблицу до rows строк; сигналы при bulk_create не
+        # срабатывают, поэтому сроки SLA, агрегаты KPI и счётчики — вручную
+        start, self.rows = self.rows, rows
+        numbers = range(start, rows)
+        users = User.objects.bulk_create([User(username=f'budget-{i:04d}') for i in numbers])
+        Profile.objects.bulk_create([
+            Profile(user=user, role='manager' if i % 10 == 0 else 'client') for i, user in enumerate(users)
+        ])
+        people = users or [self.admin]
+        orders = [OrderQueue(
+            title=f'Портал недоступен {i}', description=f'Заявка номер {i}: портал не открывается',
+            initiator=self.client_user if i % 2 else people[i % len(people)],
+            executor=people[(i + 1) % len(people)],
+            status=('new', 'in_progress', 'done')[i % 3], priority=('low', 'medium', 'high')[i // 3 % 3],
+        ) for i in numbers]
+        apply_sla(orders)
+        orders = OrderQueue.objects.bulk_create(orders)
+        Incident.objects.bulk_create([Incident(
+            title=f'Сбой портала {i}', description='Сбой сервиса', status='Открыт' if i % 2 else 'Закрыт',
+            detected_at=self.now - timedelta(minutes=i), related_order=orders[i - start] if i % 2 else None,
+        ) for i in numbers])
+        records = KPIRecord.objects.bulk_create([KPIRecord(
+            metric=f'Метрика {i % 5}', service_name=f'Сервис {i % 4}', value=i % 100,
+            timestamp=self.now - timedelta(minutes=7 * i),
+        ) for i in numbers])
+        add_records(records)
+        Shift.objects.bulk_create([Shift(
+            employee=people[i % len(people)], date=self.now.date() + timedelta(days=i // 2),
+            shift=('day', 'night')[i % 2], phone='+7 (900) 000-00-00',
+        ) for i in numbers])
+        Report.objects.bulk_create([Report(
+            report_type='daily', period_from=self.now.date(), period_to=self.now.date(),
+            author=people[i % len(people)], status='done', file=f'reports/missing-{i}.csv',
+        ) for i in numbers])
+        Document.objects.bulk_create([Document(
+            title=f'Регламент {i}', slug=f'budget-{i}', description='Регламент работ', file=f'docs/missing-{i}.txt',
+            access=('public', 'client', 'internal')[i % 3], text=f'регламент работ номер {i}',
+        ) for i in numbers])
+        recount()
+
+    def measure(self, client, url, post=None):
+        # первый запрос записывает сессию и прогревает кеш ролей, в замер не входит;
+        # кеш страниц и политик SLA очищается, чтобы представление выполнилось целиком
+        cache.clear()
+        client.get(url)
+        cache.clear()
+        kwargs = post() if post else None
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(url, **kwargs) if post else client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, ctx.captured_queries
+
+    def budgets(self):
+        # [(адрес, бюджет, клиент: 'anon' | 'staff' | 'client', ожидаемый код[, post])];
+        # post — функция, возвращающая аргументы client.post; вызывается после
+        # наполнения, вне замера
+        return []
+
+    def assertQueryBudgets(self):
+        budgets = self.budgets()
+        counts = {}
+        for rows in ROWS:
+            self.fill(rows)
+            for number, (url, budget, client, status, *post) in enumerate(budgets):
+                response, queries = self.measure(self.clients[client], url, *post)
+                counts[rows, number] = (response.status_code, queries)
+        for number, (url, budget, client, status, *post) in enumerate(budgets):
+            with self.subTest(url=url, client=client, method='POST' if post else 'GET'):
+                small = counts[ROWS[0], number][1]
+                code, large = counts[ROWS[-1], number]
+                self.assertEqual(code, status)
+                if len(large) > len(small):
+                    self.fail(f'{url}: число запросов растёт с данными ({len(small)} при {ROWS[0]} строках, '
+                              f'{len(large)} при {ROWS[-1]}):\n{self.format_queries(large)}')
+                worst = max(small, large, key=len)
+                if len(worst) > budget:
+                    self.fail(f'{url}: {len(worst)} запросов при бюджете {budget}:\n{self.format_queries(worst)}')
+
+    @staticmethod
+    def format_queries(queries):
+        return '\n'.join(f"{number}. {query['sql']}" for number, query in enumerate(queries, 1))
+
+@override_settings(KPI_INGEST_TOKENS=['budget-token'])
+class DashboardQueryBudgetTests(QueryBudgetTestCase):
+    # у записывающих адресов тело запроса одного размера при любом объёме таблиц:
+    # проверяется, что стоимость не зависит от уже накопленных данных
+
+    def last_orders(self):
+        # последние девять заявок наполнения — все сочетания статуса и приоритета,
+        # то есть одинаковый набор обновляемых счётчиков
+        return list(OrderQueue.objects.order_by('-id').values_list('id', flat=True)[:9])
+
+    def kpi_lines(self):
+        # свежие точки агента в пределах одного часа; 200 строк — одна вставка
+        hour = bucket_start(self.now, 'hour') - timedelta(hours=1)
+        lines = (json.dumps({'metric': 'Метрика 0', 'service_name': 'Сервис 0', 'value': i,
+                             'timestamp': (hour + timedelta(seconds=10 * i)).isoformat()}) for i in range(200))
+        return '\n'.join(lines)
+
+    def budgets(self):
+        queue = reverse('dashboard:queue_list')
+        incidents = reverse('dashboard:incidents_list')
+        queue_api = reverse('dashboard:queue_api')
+        kpi_api = reverse('dashboard:kpi_api')
+        detail = reverse('dashboard:queue_detail', args=[self.order.pk])
+        return [
+            (reverse('dashboard:home'), 3, 'staff', 200),
+            (reverse('dashboard:home'), 2, 'client', 302),
+            (queue, 6, 'staff', 200),
+            (queue + '?sort=worklist', 6, 'staff', 200),
+            (queue + '?q=портал', 6, 'staff', 200),
+            (queue + '?cursor=', 5, 'staff', 200),
+            (reverse('dashboard:queue_create'), 3, 'staff', 200),
+            (detail, 5, 'staff', 200),
+            (detail, 5, 'client', 200),
+            (reverse('dashboard:queue_edit', args=[self.order.pk]), 4, 'staff', 200),
+            (reverse('dashboard:kpi_dashboard'), 3, 'staff', 200),
+            (incidents, 5, 'staff', 200),
+            (incidents + '?q=сбой', 5, 'staff', 200),
+            (incidents + '?cursor=', 4, 'staff', 200),
+            (reverse('dashboard:shifts_list'), 3, 'staff', 200),
+            (reverse('dashboard:reports_panel'), 3, 'staff', 200),
+            (reverse('dashboard:report_download', args=[self.report.pk]), 3, 'staff', 200),
+            (reverse('dashboard:docs_manage'), 3, 'staff', 200),
+            (reverse('dashboard:client_home'), 3, 'client', 200),
+            (queue_api, 4, 'staff', 200),
+            (queue_api + '?sort=worklist', 4, 'staff', 200),
+            (queue_api + '?q=портал', 4, 'staff', 200),
+            (kpi_api, 4, 'staff', 200),
+            (kpi_api + '?days=30', 4, 'staff', 200),
+            (kpi_api + '?points=100', 4, 'staff', 200),
+            (reverse('dashboard:kpi_export'), 3, 'staff', 200),
+            (reverse('dashboard:queue_export') + '?format=ndjson', 3, 'staff', 200),
+            (reverse('dashboard:queue_bulk'), 23, 'staff', 302,
+             lambda: {'data': {'ids': self.last_orders(), 'status': 'in_progress'}}),
+            (reverse('dashboard:queue_bulk_api'), 15, 'staff', 200,
+             lambda: {'data': {'ids': self.last_orders(), 'set': {'priority': 'high'}}, 'content_type': 'application/json'}),
+            (reverse('dashboard:kpi_ingest'), 14, 'anon', 200,
+             lambda: {'data': self.kpi_lines(), 'content_type': 'application/x-ndjson',
+                      'headers': {'Authorization': 'Bearer budget-token'}}),
+        ]
+
+    def test_query_budgets(self):
+        self.assertQueryBudgets()
+
+def make_staff_client(username='behaviour-admin'):
+    # клиент с ролью admin для представлений панели и API
+    user = User.objects.create(username=username, is_staff=True)
+    Profile.objects.create(user=user, role='admin')
+    client = Client()
+    client.force_login(user)
+    return client
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # половина записей с одинаковой меткой времени — порядок внутри решает id
+        now = timezone.now()
+        self.records = [KPIRecord.objects.create(
+            metric='Пагинация', service_name='Сервис', value=i,
+            timestamp=now if i % 2 else now - timedelta(minutes=i),
+        ) for i in range(11)]
+        self.qs = KPIRecord.objects.filter(metric='Пагинация')
+
+    def walk(self, **kwargs):
+        seen, cursor = [], None
+        while True:
+            items, cursor = keyset_page(self.qs, 'timestamp', cursor, 3, **kwargs)
+            seen.extend(item.pk for item in items)
+            if cursor is None:
+                return seen
+
+    def test_pages_cover_every_row_once(self):
+        expected = list(self.qs.order_by('timestamp', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk(), expected)
+        expected = list(self.qs.order_by('-timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(descending=True), expected)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            keyset_page(self.qs, 'timestamp', 'не-курсор', 3)
+
+@override_settings(KPI_INGEST_TOKENS=['agent-token'])
+class KPIIngestTests(TestCase):
+    url = reverse_lazy('dashboard:kpi_ingest')
+
+    def post(self, body, token='agent-token', content_type='application/x-ndjson'):
+        return Client().post(self.url, body, content_type=content_type, headers={'Authorization': f'Bearer {token}'})
+
+    def line(self, value, **fields):
+        row = {'metric': 'Приём', 'service_name': 'Агент', 'value': value, 'timestamp': '2026-01-05T10:00:00+00:00'}
+        row.update(fields)
+        return json.dumps(row, ensure_ascii=False).encode('utf-8')
+
+    def test_rejects_bad_tokens(self):
+        self.assertEqual(self.post(self.line(1), token='чужой').status_code, 401)
+        self.assertEqual(self.post(self.line(1), token='wrong').status_code, 401)
+        self.assertEqual(Client().post(self.url, self.line(1), content_type='application/x-ndjson').status_code, 401)
+        self.assertFalse(KPIRecord.objects.filter(metric='Приём').exists())
+
+    def test_counts_rows_and_reports_source_lines(self):
+        body = b'\n'.join([
+            self.line(1), b'', self.line('x'), b'\xff\xfe', self.line(2, timestamp='вчера'), b'[1]', self.line(3),
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(body)
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result['accepted'], result['rejected']), (2, 4))
+        self.assertEqual([e['row'] for e in result['errors']], [3, 4, 5, 6])
+        self.assertEqual(KPIRecord.objects.filter(metric='Приём').count(), 2)
+        # пакетный путь обновляет агрегаты и счётчики так же, как сигналы
+        hour = KPIRollup.objects.get(period='hour', metric='Приём')
+        self.assertEqual((hour.count, hour.total), (2, 4.0))
+        self.assertEqual(recount(), {})
+
+    def test_csv(self):
+        body = 'metric,value,timestamp,service_name\nПриём,5,2026-01-05T10:00:00,Агент\nПриём,,2026-01-05T10:00:00,Агент\n'
+        result = self.post(body.encode('utf-8'), content_type='text/csv').json()
+        self.assertEqual((result['accepted'], result['rejected']), (1, 1))
+        self.assertEqual(result['errors'][0]['row'], 3)
+        response = self.post(b'metric,value\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+
+class DownsampleTests(SimpleTestCase):
+    def series(self, n=1000, spike_at=437):
+        start = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        points = []
+        for i in range(n):
+            value = 100.0 if i == spike_at else float(i % 3)
+            points.append({'timestamp': (start + timedelta(minutes=i)).isoformat(), 'value': value, 'min': value, 'max': value})
+        return points
+
+    def test_lttb_keeps_peak(self):
+        sampled = lttb(self.series(), 50)
+        self.assertLessEqual(len(sampled), 50)
+        self.assertEqual(max(p['value'] for p in sampled), 100.0)
+        self.assertEqual(max(p['max'] for p in sampled), 100.0)
+
+    def test_minmax_keeps_peak(self):
+        sampled = minmax(self.series(), 50)
+        self.assertLessEqual(len(sampled), 50)
+        self.assertEqual(max(p['value'] for p in sampled), 100.0)
+
+    def test_minmax_keeps_both_extremes_of_one_point(self):
+        # агрегат, у которого минимум и максимум корзины — одна точка
+        points = [dict(p, value=5.0, min=5.0, max=5.0) for p in self.series(8)]
+        points[2] = dict(points[2], value=50.0, min=1.0, max=99.0)
+        values = [p['value'] for p in minmax(points, 4)]
+        self.assertIn(1.0, values)
+        self.assertIn(99.0, values)
+
+class DerivedDataTests(TestCase):
+    # счётчики сводки и агрегаты KPI, которые сигналы ведут инкрементально,
+    # совпадают с пересчётом с нуля
+    def test_counters_follow_save_and_delete(self):
+        order = OrderQueue.objects.create(title='Счётчик', description='-', priority='low')
+        order.status = 'in_progress'
+        order.priority = 'high'
+        order.save()
+        incident = Incident.objects.create(title='Сбой', description='-', status='Открыт', detected_at=timezone.now())
+        incident.status = 'Закрыт'
+        incident.save()
+        KPIRecord.objects.create(metric='Счётчик', service_name='Сервис', value=1, timestamp=timezone.now()).delete()
+        self.assertEqual(recount(), {})
+        order.delete()
+        self.assertEqual(recount(), {})
+
+    def test_rollups_match_rebuild(self):
+        now = timezone.now()
+        for i in range(30):
+            KPIRecord.objects.create(metric='Агрегат', service_name=f'Сервис {i % 2}', value=i, timestamp=now - timedelta(hours=7 * i))
+        columns = ('period', 'bucket', 'metric', 'service_name', 'count', 'total', 'min_value', 'max_value', 'last_value')
+        incremental = sorted(KPIRollup.objects.values_list(*columns))
+        rebuild_rollups()
+        self.assertEqual(sorted(KPIRollup.objects.values_list(*columns)), incremental)
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = make_staff_client()
+
+    def revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        return first, self.client.get(url, headers={'If-None-Match': first['ETag']})
+
+    def test_queue_etag_changes_after_write(self):
+        url = reverse('dashboard:queue_api')
+        first, again = self.revalidate(url)
+        self.assertEqual(again.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderQueue.objects.create(title='Новая заявка', description='-')
+        response = self.client.get(url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Новая заявка', [item['title'] for item in response.json()['results']])
+
+    def test_worklist_etag_changes_after_policy_change(self):
+        # пересчёт urgency_at идёт UPDATE без сигналов — версия меняется явно
+        OrderQueue.objects.create(title='Срочная', description='-', priority='high')
+        url = reverse('dashboard:queue_api') + '?sort=worklist'
+        first, again = self.revalidate(url)
+        self.assertEqual(again.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            policy = SLAPolicy.objects.get(priority='high')
+            policy.worklist_lead_minutes += 60
+            policy.save()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': first['ETag']}).status_code, 200)
+
+    def test_kpi_window_revalidates_every_minute(self):
+        url = reverse('dashboard:kpi_api') + '?points=50'
+        with mock.patch('dashboard.decorators.time.time', return_value=60 * 1000):
+            first, again = self.revalidate(url)
+        self.assertEqual(again.status_code, 304)
+        self.assertFalse(first.has_header('Last-Modified'))
+        with mock.patch('dashboard.decorators.time.time', return_value=60 * 1001):
+            later = self.client.get(url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(later.status_code, 200)
+        # только If-Modified-Since окно не подтверждает
+        future = 'Wed, 01 Jan 2098 00:00:00 GMT'
+        self.assertEqual(self.client.get(url, headers={'If-Modified-Since': future}).status_code, 200)
+
+class ChangeStreamTests(TestCase):
+    def test_no_stream_under_wsgi(self):
+        # тестовый клиент — WSGI: бесконечный поток здесь не отдаётся вовсе
+        response = make_staff_client().get(reverse('dashboard:changes_stream'))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+class BulkUpdateTests(TestCase):
+    def test_results_per_id(self):
+        new = OrderQueue.objects.create(title='Новая', description='-', status='new')
+        taken = OrderQueue.objects.create(title='В работе', description='-', status='in_progress')
+        missing = taken.pk + 1000
+        with self.captureOnCommitCallbacks(execute=True):
+            result = bulk_update_orders([new.pk, taken.pk, missing], {'status': 'in_progress'})
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(result['results'], {new.pk: 'updated', taken.pk: 'unchanged', missing: 'not_found'})
+        new.refresh_from_db()
+        self.assertEqual(new.status, 'in_progress')
+        self.assertEqual(recount(), {})
+
+    def test_rejects_unknown_status(self):
+        with self.assertRaises(BulkError):
+            parse_changes({'status': 'archived'})
+
+class ReplicaRouterTests(SimpleTestCase):
+    def handle(self, request):
+        # представление: читает с реплики, пишет, читает снова (None — основная база)
+        router = ReplicaRouter()
+        routing_state()['replica'] = True
+        before = router.db_for_read(OrderQueue)
+        router.db_for_write(OrderQueue)
+        after = router.db_for_read(OrderQueue)
+        return HttpResponse(f'{before},{after}')
+
+    @mock.patch('project.routers.replica_configured', return_value=True)
+    def test_write_pins_request_and_client(self, configured):
+        response = ReplicaPinMiddleware(self.handle)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'replica,None')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        # следующий запрос с cookie читает с основной базы с самого начала
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        response = ReplicaPinMiddleware(self.handle)(request)
+        self.assertEqual(response.content, b'None,None')
+
+class SLAScanTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_scan_is_idempotent(self):
+        now = timezone.now()
+        order = OrderQueue.objects.create(title='Просрочена', description='-', priority='high',
+                                          sla_deadline=now - timedelta(minutes=5))
+        first = scan(now=now)
+        self.assertEqual((first['breach'], first['incidents']), (1, 1))
+        self.assertEqual(scan(now=now), {'breach': 0, 'warning': 0, 'incidents': 0})
+        self.assertEqual(scan(now=now + timedelta(minutes=1))['breach'], 0)
+        self.assertEqual(SLAEvent.objects.filter(order=order, kind='breach').count(), 1)
+
+    def test_reopened_and_moved_deadlines_are_flagged(self):
+        # сроки внутри уже просканированного отрезка: сканер их больше не увидит
+        now = timezone.now()
+        reopened = OrderQueue.objects.create(title='Закрыта', description='-', status='done',
+                                             sla_deadline=now - timedelta(hours=1))
+        moved = OrderQueue.objects.create(title='Перенесена', description='-', priority='low')
+        scan()
+        reopened.status = 'in_progress'
+        reopened.save()
+        moved.sla_deadline = now - timedelta(minutes=10)
+        moved.save()
+        breached = SLAEvent.objects.filter(kind='breach').values_list('order_id', flat=True)
+        self.assertCountEqual(breached, [reopened.pk, moved.pk])
+        self.assertEqual(scan()['breach'], 0)
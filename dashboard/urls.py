@@ -8,6 +8,7 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('queue/', views.queue_list, name='queue_list'),
     path('queue/create/', views.queue_create, name='queue_create'),
+    path('queue/bulk/', views.queue_bulk, name='queue_bulk'),
     path('queue/<int:pk>/', views.queue_detail, name='queue_detail'),
     path('queue/<int:pk>/edit/', views.queue_edit, name='queue_edit'),
     path('kpi/', views.kpi_dashboard, name='kpi_dashboard'),
@@ -20,4 +21,9 @@ urlpatterns = [
     # API
     path('api/queue/', views.queue_api, name='queue_api'),
     path('api/kpi/', views.kpi_api, name='kpi_api'),
+    path('api/kpi/ingest/', views.kpi_ingest, name='kpi_ingest'),
+    path('api/kpi/export/', views.kpi_export, name='kpi_export'),
+    path('api/queue/bulk/', views.queue_bulk_api, name='queue_bulk_api'),
+    path('api/queue/export/', views.queue_export, name='queue_export'),
+    path('api/changes/stream/', views.changes_stream, name='changes_stream'),
 ]
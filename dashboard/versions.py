@@ -0,0 +1,62 @@
+import time
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F, PositiveBigIntegerField, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import DataDayVersion, ModelVersion
+
+# версия данных за период — сумма дневных счётчиков: любое изменение заявки,
+# инцидента или записи KPI в периоде её увеличивает
+
+def day_of(ts):
+    if timezone.is_naive(ts):
+        ts = timezone.make_aware(ts)
+    return timezone.localdate(ts)
+
+def bump_days(days):
+    for day in set(days):
+        if DataDayVersion.objects.filter(day=day).update(version=F('version') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                DataDayVersion.objects.create(day=day, version=1)
+        except IntegrityError:
+            DataDayVersion.objects.filter(day=day).update(version=F('version') + 1)
+
+def period_version(date_from, date_to):
+    total = DataDayVersion.objects.filter(day__gte=date_from, day__lte=date_to).aggregate(v=Sum('version'))['v']
+    return total or 0
+
+# версии таблиц для кеша страниц и ETag: метка времени последнего изменения в
+# таблице ModelVersion. Новая версия меняет ключи, старые записи кеша просто
+# перестают читаться
+
+def label_versions(*labels):
+    # всегда с основной базы: по версиям решается, можно ли читать с реплики
+    found = dict(ModelVersion.objects.using(DEFAULT_DB_ALIAS).filter(label__in=labels).values_list('label', 'version'))
+    return [found.get(label, 0) for label in labels]
+
+def model_versions(*models):
+    return label_versions(*(m._meta.label_lower for m in models))
+
+def _bump(labels):
+    stamp = time.time_ns()
+    # версия только растёт, даже если часы процессов немного расходятся
+    version = Greatest(F('version') + 1, Value(stamp), output_field=PositiveBigIntegerField())
+    with transaction.atomic():
+        for label in labels:
+            if ModelVersion.objects.filter(label=label).update(version=version):
+                continue
+            try:
+                with transaction.atomic():
+                    ModelVersion.objects.create(label=label, version=stamp)
+            except IntegrityError:
+                ModelVersion.objects.filter(label=label).update(version=version)
+
+def bump_labels(*labels):
+    # после коммита: иначе параллельный запрос закеширует ещё старые данные
+    transaction.on_commit(lambda: _bump(labels))
+
+def bump_models(*models):
+    bump_labels(*(m._meta.label_lower for m in models))
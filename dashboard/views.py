@@ -1,210 +1,93 @@
 
+import hmac
+import json
 import os
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
-from django.http import JsonResponse, FileResponse, HttpResponseForbidden
+from django.http import Http404, HttpResponse, JsonResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme, urlencode
 from django.conf import settings
-from django.contrib.auth.models import User
-
-from .models import OrderQueue, KPIRecord, Incident, Shift, Document, Report
-from .forms import OrderForm, DocumentForm, ReportForm
-
-def get_role(user):
-    profile = getattr(user, 'profile', None)
-    if profile:
-        return profile.role
-    if user.is_superuser:
-        return 'admin'
-    return 'client'
-
-def ensure_sample_data():
-    # пользователи для связей
-    admin = User.objects.filter(username='admin').first()
-    manager = User.objects.filter(username='manager').first()
-    client = User.objects.filter(username='client').first()
-
-    # Очередь заявок
-    if OrderQueue.objects.count() == 0 and client:
-        OrderQueue.objects.create(
-            title='Недоступен портал клиентов',
-            description='Пользователи сообщают о недоступности портала авторизации.',
-            initiator=client,
-            executor=manager or admin,
-            status='in_progress',
-            priority='high',
-            sla_deadline=timezone.now() + timezone.timedelta(hours=4),
-        )
-        OrderQueue.objects.create(
-            title='Ошибка при формировании отчёта',
-            description='При генерации отчёта за месяц появляется сообщение об ошибке.',
-            initiator=client,
-            executor=manager or admin,
-            status='new',
-            priority='medium',
-            sla_deadline=timezone.now() + timezone.timedelta(hours=8),
-        )
-        OrderQueue.objects.create(
-            title='Уточнение прав доступа',
-            description='Необходимо выдать права на просмотр отчётов для нового сотрудника.',
-            initiator=client,
-            executor=manager or admin,
-            status='done',
-            priority='low',
-            sla_deadline=timezone.now() - timezone.timedelta(hours=1),
-        )
-
-    # KPI
-    if KPIRecord.objects.count() == 0:
-        base = timezone.now()
-        for i in range(7):
-            day = base - timezone.timedelta(days=i)
-            KPIRecord.objects.create(
-                metric='Среднее время решения',
-                value=4.0 - i * 0.2,
-                timestamp=day,
-                service_name='Портал клиентов',
-            )
-            KPIRecord.objects.create(
-                metric='Доступность сервиса',
-                value=99.0 + i * 0.1,
-                timestamp=day,
-                service_name='Система биллинга',
-            )
+from django.contrib import messages
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
-    # Инциденты
-    if Incident.objects.count() == 0:
-        Incident.objects.create(
-            title='Снижение скорости обработки запросов',
-            description='Зафиксировано увеличение времени отклика портала клиентов.',
-            status='В работе',
-            criticality='medium',
-            detected_at=timezone.now() - timezone.timedelta(hours=3),
-            related_order=OrderQueue.objects.first(),
-        )
-        Incident.objects.create(
-            title='Кратковременная недоступность биллинга',
-            description='Пользователи не могли формировать счета в течение 10 минут.',
-            status='Закрыт',
-            criticality='high',
-            detected_at=timezone.now() - timezone.timedelta(days=1, hours=2),
-            closed_at=timezone.now() - timezone.timedelta(days=1),
-        )
+from accounts.utils import request_role
 
-    # Смены
-    if Shift.objects.count() == 0 and (admin or manager):
-        base_date = timezone.now().date()
-        for i in range(5):
-            Shift.objects.create(
-                employee=manager or admin,
-                date=base_date + timezone.timedelta(days=i),
-                shift='day',
-                comment='Плановая дневная смена',
-                phone='+7 (900) 000-00-01',
-            )
-        Shift.objects.create(
-            employee=admin or manager,
-            date=base_date,
-            shift='night',
-            comment='Ночная смена дежурного инженера',
-            phone='+7 (900) 000-00-02',
-        )
-
-    # Документы
-    if Document.objects.count() == 0:
-        docs_dir = settings.MEDIA_ROOT / 'docs'
-        os.makedirs(docs_dir, exist_ok=True)
-        try:
-            from docx import Document as DocxDocument
-            def make_doc(filename, title_text, body_text):
-                doc = DocxDocument()
-                doc.add_heading(title_text, level=1)
-                doc.add_paragraph(body_text)
-                full_path = docs_dir / filename
-                doc.save(full_path)
-            make_doc('reglament_incidents.docx', 'Регламент обработки инцидентов',
-                     'Документ описывает порядок регистрации, классификации и эскалации инцидентов.')
-            make_doc('reglament_shifts.docx', 'Регламент организации смен',
-                     'Документ фиксирует правила формирования графика смен и обязанности дежурного персонала.')
-            make_doc('instruction_portal.docx', 'Инструкция пользователя портала',
-                     'Инструкция по работе с порталом и отслеживанию статусов обращений.')
-        except Exception:
-            # резервный вариант: текстовые файлы
-            def make_txt(filename, body_text):
-                full_path = docs_dir / filename
-                with open(full_path, 'w', encoding='utf8') as f:
-                    f.write(body_text)
-            make_txt('reglament_incidents.txt', 'Регламент обработки инцидентов.')
-            make_txt('reglament_shifts.txt', 'Регламент организации смен.')
-            make_txt('instruction_portal.txt', 'Инструкция пользователя портала.')
-
-        # создать записи в БД
-        for fname, title, desc in [
-            ('reglament_incidents.docx', 'Регламент обработки инцидентов', 'Порядок регистрации и сопровождения инцидентов.'),
-            ('reglament_shifts.docx', 'Регламент организации смен', 'Описание процедуры планирования смен и ответственности.'),
-            ('instruction_portal.docx', 'Инструкция пользователя портала', 'Руководство по работе с порталом для клиентов.'),
-        ]:
-            # если docx не создан, пробуем txt
-            path_docx = docs_dir / fname
-            path_txt = docs_dir / fname.replace('.docx', '.txt')
-            if path_docx.exists():
-                rel = f'docs/{fname}'
-            elif path_txt.exists():
-                rel = f'docs/{path_txt.name}'
-            else:
-                continue
-            Document.objects.get_or_create(
-                slug=fname.split('.')[0],
-                defaults={
-                    'title': title,
-                    'description': desc,
-                    'file': rel,
-                    'access': 'public',
-                }
-            )
+from .models import OrderQueue, KPIRecord, KPIRollup, Incident, Shift, Document, Report
+from .forms import OrderForm, DocumentForm, ReportForm
+from .bulk import BulkError, bulk_update_orders, filter_ids, parse_changes, parse_ids
+from .changes import TOPICS, alatest_change_id, feed, latest_change_id
+from .counters import summary as counter_summary
+from .decorators import conditional_on, replica_reads
+from .delivery import serve_file, stream_body
+from .downsample import MAX_CHART_POINTS, METHODS, downsample
+from .export import KPI_COLUMNS, ORDER_COLUMNS, parse_bound, stream_rows
+from .jobs import find_cached_report
+from .ingest import RowError, ingest, iter_csv, iter_ndjson
+from .pagination import InvalidCursor, keyset_page, page_size
+from .rollups import PERIODS, bucket_start, choose_period, kpi_series
+from .search import highlight, search
+from .sla import worklist
 
 @login_required
 def home(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role == 'client':
         return redirect('dashboard:client_home')
-    open_orders = OrderQueue.objects.filter(status__in=['new','in_progress']).count()
-    incidents_open = Incident.objects.exclude(status='Закрыт').count()
-    kpi_count = KPIRecord.objects.count()
-    return render(request, 'dashboard/home.html', {
-        'open_orders': open_orders,
-        'incidents_open': incidents_open,
-        'kpi_count': kpi_count,
-    })
+    # сводка из материализованных счётчиков — один запрос вместо трёх COUNT
+    return render(request, 'dashboard/home.html', counter_summary())
 
 @login_required
 def queue_list(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager']:
         return HttpResponseForbidden('Доступ запрещён.')
-    qs = OrderQueue.objects.select_related('initiator','executor').order_by('-created_at')
+    qs = OrderQueue.objects.select_related('initiator','executor').order_by('-created_at', '-id')
     status = request.GET.get('status')
     priority = request.GET.get('priority')
     if status:
         qs = qs.filter(status=status)
     if priority:
         qs = qs.filter(priority=priority)
+    q = request.GET.get('q', '').strip()
+    sort = 'worklist' if request.GET.get('sort') == 'worklist' else ''
+    filters = urlencode({k: v for k, v in (('status', status), ('priority', priority), ('q', q), ('sort', sort)) if v})
+    context = {'status': status, 'priority': priority, 'q': q, 'sort': sort, 'filters': filters, 'now': timezone.now(),
+               # номер события до выборки: страница подпишется на всё, что изменится после
+               'last_event': latest_change_id(),
+               'executors': User.objects.order_by('username').only('id', 'username')}
+    sort_field, descending = 'created_at', True
+    if q:
+        # результаты поиска идут по релевантности, страницы — с номерами
+        qs = search(qs, q)
+    elif sort:
+        # рабочий список: открытые заявки по срочности SLA с учётом приоритета
+        qs = worklist(qs)
+        sort_field, descending = 'urgency_at', False
+    # ?cursor= — постраничный просмотр по курсору для дальних страниц
+    if 'cursor' in request.GET and not q:
+        try:
+            page_obj, next_cursor = keyset_page(qs, sort_field, request.GET.get('cursor'), 20, descending=descending)
+        except InvalidCursor:
+            page_obj, next_cursor = keyset_page(qs, sort_field, None, 20, descending=descending)
+        return render(request, 'dashboard/queue_list.html', dict(context, page_obj=page_obj, cursor_mode=True, next_cursor=next_cursor))
     paginator = Paginator(qs, 20)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-    return render(request, 'dashboard/queue_list.html', {
-        'page_obj': page_obj,
-        'status': status,
-        'priority': priority,
-    })
+    if q:
+        for o in page_obj:
+            o.snippet = highlight(o.search_snippet)
+    return render(request, 'dashboard/queue_list.html', dict(context, page_obj=page_obj))
 
 @login_required
 def queue_create(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager', 'client']:
         return HttpResponseForbidden('Доступ запрещён.')
     if request.method == 'POST':
@@ -220,8 +103,7 @@ def queue_create(request):
 
 @login_required
 def queue_edit(request, pk):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager']:
         return HttpResponseForbidden('Доступ запрещён.')
     order = get_object_or_404(OrderQueue, pk=pk)
@@ -234,10 +116,29 @@ def queue_edit(request, pk):
         form = OrderForm(instance=order)
     return render(request, 'dashboard/queue_form.html', {'form': form, 'mode': 'edit', 'order': order})
 
+# массовая правка отмеченных в queue_list заявок; обратно — на ту же страницу
+@login_required
+@require_POST
+def queue_bulk(request):
+    role = request_role(request)
+    if role not in ['admin', 'manager']:
+        return HttpResponseForbidden('Доступ запрещён.')
+    try:
+        ids = parse_ids(request.POST.getlist('ids'))
+        changes = parse_changes(request.POST)
+    except BulkError as exc:
+        messages.error(request, f'Заявки не изменены: {exc}')
+    else:
+        result = bulk_update_orders(ids, changes)
+        messages.success(request, f"Изменено заявок: {result['updated']} из {len(ids)}")
+    next_url = request.POST.get('next')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse('dashboard:queue_list')
+    return redirect(next_url)
+
 @login_required
 def queue_detail(request, pk):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager', 'client']:
         return HttpResponseForbidden('Доступ запрещён.')
     order = get_object_or_404(OrderQueue, pk=pk)
@@ -248,38 +149,47 @@ def queue_detail(request, pk):
 
 @login_required
 def kpi_dashboard(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager']:
         return HttpResponseForbidden('Доступ запрещён.')
-    last_30 = timezone.now() - timezone.timedelta(days=30)
-    kpi = KPIRecord.objects.filter(timestamp__gte=last_30)
-    series = {}
-    for rec in kpi:
-        series.setdefault(rec.metric, []).append({
-            'timestamp': rec.timestamp.isoformat(),
-            'value': rec.value,
-        })
+    span = timezone.timedelta(days=30)
+    series = kpi_series(timezone.now() - span, period=choose_period(span))
+    series = downsample(series, settings.KPI_CHART_POINTS)
     return render(request, 'dashboard/kpi_dashboard.html', {
-        'kpi': kpi,
         'series_json': series,
     })
 
 @login_required
 def incidents_list(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager']:
         return HttpResponseForbidden('Доступ запрещён.')
-    items = Incident.objects.order_by('-detected_at')
+    last_event = latest_change_id()
+    items = Incident.objects.order_by('-detected_at', '-id')
+    q = request.GET.get('q', '').strip()
+    if q:
+        items = search(items, q)
+    elif 'cursor' in request.GET:
+        try:
+            page_obj, next_cursor = keyset_page(items, 'detected_at', request.GET.get('cursor'), 20, descending=True)
+        except InvalidCursor:
+            page_obj, next_cursor = keyset_page(items, 'detected_at', None, 20, descending=True)
+        return render(request, 'dashboard/incidents_list.html', {
+            'page_obj': page_obj,
+            'cursor_mode': True,
+            'next_cursor': next_cursor,
+            'last_event': last_event,
+        })
     paginator = Paginator(items, 20)
     page_obj = paginator.get_page(request.GET.get('page'))
-    return render(request, 'dashboard/incidents_list.html', {'page_obj': page_obj})
+    if q:
+        for i in page_obj:
+            i.snippet = highlight(i.search_snippet)
+    return render(request, 'dashboard/incidents_list.html', {'page_obj': page_obj, 'q': q, 'last_event': last_event})
 
 @login_required
 def shifts_list(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager']:
         return HttpResponseForbidden('Доступ запрещён.')
     items = Shift.objects.select_related('employee').order_by('date')
@@ -287,8 +197,7 @@ def shifts_list(request):
 
 @login_required
 def reports_panel(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager']:
         return HttpResponseForbidden('Доступ запрещён.')
     if request.method == 'POST':
@@ -296,50 +205,34 @@ def reports_panel(request):
         if form.is_valid():
             report = form.save(commit=False)
             report.author = request.user
-            try:
-                from docx import Document as DocxDocument
-                doc = DocxDocument()
-                doc.add_heading('Отчёт по сервисам', level=1)
-                doc.add_paragraph(f"Тип: {report.get_report_type_display()}")
-                doc.add_paragraph(f"Период: {report.period_from} – {report.period_to}")
-                path_dir = settings.MEDIA_ROOT / 'reports'
-                os.makedirs(path_dir, exist_ok=True)
-                filename = f"report_{report.report_type}_{report.period_from}_{report.period_to}.docx"
-                full_path = path_dir / filename
-                doc.save(full_path)
-                report.file.name = f"reports/{filename}"
-            except Exception:
-                path_dir = settings.MEDIA_ROOT / 'reports'
-                os.makedirs(path_dir, exist_ok=True)
-                filename = f"report_{report.report_type}_{report.period_from}_{report.period_to}.txt"
-                full_path = path_dir / filename
-                with open(full_path, 'w', encoding='utf8') as f:
-                    f.write('Отчёт по сервисам\n')
-                    f.write(f"Тип: {report.get_report_type_display()}\n")
-                    f.write(f"Период: {report.period_from} – {report.period_to}\n")
-                report.file.name = f"reports/{filename}"
+            # тот же отчёт по неизменившимся данным не формируется повторно
+            cached = find_cached_report(report)
+            if cached:
+                messages.info(request, 'Такой отчёт уже есть в списке — данные за период не менялись.')
+                return redirect('dashboard:reports_panel')
+            # файл формирует run_report_worker, запрос только ставит задание
+            report.status = 'queued'
             report.save()
             return redirect('dashboard:reports_panel')
     else:
         form = ReportForm()
-    reports = Report.objects.order_by('-created_at')
-    return render(request, 'dashboard/reports_panel.html', {'reports': reports, 'form': form})
+    reports = list(Report.objects.order_by('-created_at'))
+    pending = any(r.status in ('queued', 'running') for r in reports)
+    return render(request, 'dashboard/reports_panel.html', {'reports': reports, 'form': form, 'pending': pending})
 
 @login_required
 def report_download(request, pk):
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager']:
         return HttpResponseForbidden('Доступ запрещён.')
     report = get_object_or_404(Report, pk=pk)
-    if not report.file:
-        raise HttpResponseForbidden('Файл отчёта не найден.')
-    full_path = report.file.path
-    return FileResponse(open(full_path, 'rb'), as_attachment=True, filename=os.path.basename(full_path))
+    if not report.file or not os.path.exists(report.file.path):
+        raise Http404('Файл отчёта не найден.')
+    return serve_file(request, report.file, report.download_name, content_hash=report.content_hash)
 
 @login_required
 def docs_manage(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager']:
         return HttpResponseForbidden('Доступ запрещён.')
     if request.method == 'POST':
@@ -349,13 +242,12 @@ def docs_manage(request):
             return redirect('dashboard:docs_manage')
     else:
         form = DocumentForm()
-    docs = Document.objects.all()
+    docs = Document.objects.defer('text')
     return render(request, 'dashboard/docs_manage.html', {'docs': docs, 'form': form})
 
 @login_required
 def client_home(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role != 'client':
         return redirect('dashboard:home')
     my_orders = OrderQueue.objects.filter(initiator=request.user).order_by('-created_at')
@@ -363,41 +255,260 @@ def client_home(request):
 
 # API views
 @login_required
+@conditional_on(OrderQueue)
+@replica_reads(OrderQueue)
 def queue_api(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager']:
         return HttpResponseForbidden('Доступ запрещён.')
-    qs = OrderQueue.objects.order_by('-created_at')
+    qs = OrderQueue.objects.all()
     status = request.GET.get('status')
     priority = request.GET.get('priority')
     if status:
         qs = qs.filter(status=status)
     if priority:
         qs = qs.filter(priority=priority)
-    data = [{
-        'id': o.id,
-        'title': o.title,
-        'status': o.status,
-        'priority': o.priority,
-        'created_at': o.created_at.isoformat(),
-    } for o in qs[:200]]
-    return JsonResponse({'results': data})
+    size = page_size(request.GET.get('limit'), 200)
+    q = request.GET.get('q', '').strip()
+    if q:
+        # результаты поиска упорядочены по релевантности, курсор — смещение
+        try:
+            offset = max(int(request.GET.get('cursor') or 0), 0)
+        except ValueError:
+            return JsonResponse({'error': 'Некорректный курсор'}, status=400)
+        orders = list(search(qs, q)[offset:offset + size + 1])
+        next_cursor = str(offset + size) if len(orders) > size else None
+        orders = orders[:size]
+    else:
+        # sort=worklist — открытые заявки по срочности SLA
+        if request.GET.get('sort') == 'worklist':
+            qs, sort_field, descending = worklist(qs), 'urgency_at', False
+        else:
+            sort_field, descending = 'created_at', True
+        try:
+            orders, next_cursor = keyset_page(qs, sort_field, request.GET.get('cursor'), size, descending=descending)
+        except InvalidCursor as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+    data = []
+    for o in orders:
+        item = {
+            'id': o.id,
+            'title': o.title,
+            'status': o.status,
+            'priority': o.priority,
+            'created_at': o.created_at.isoformat(),
+            'sla_deadline': o.sla_deadline.isoformat() if o.sla_deadline else None,
+        }
+        if q:
+            item['snippet'] = str(highlight(o.search_snippet))
+        data.append(item)
+    return JsonResponse({'results': data, 'next': next_cursor})
+
+# массовая правка: {"ids": [...]} или {"filter": {"status", "priority", "q"}}
+# и {"set": {"status", "priority", "executor"}}; ответ — результат по каждому id
+@login_required
+@require_POST
+def queue_bulk_api(request):
+    role = request_role(request)
+    if role not in ['admin', 'manager']:
+        return HttpResponseForbidden('Доступ запрещён.')
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Ожидается JSON'}, status=400)
+    if not isinstance(body, dict) or not isinstance(body.get('set'), dict):
+        return JsonResponse({'error': 'Ожидается объект с полями ids или filter и set'}, status=400)
+    try:
+        if 'ids' in body:
+            if not isinstance(body['ids'], list):
+                raise BulkError('ids: ожидается список номеров заявок')
+            ids = parse_ids(body['ids'])
+        elif isinstance(body.get('filter'), dict):
+            ids = filter_ids(body['filter'])
+        else:
+            raise BulkError('нужен список ids или фильтр filter')
+        changes = parse_changes(body['set'])
+    except BulkError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    result = bulk_update_orders(ids, changes)
+    return JsonResponse({
+        'updated': result['updated'],
+        'results': [{'id': pk, 'result': value} for pk, value in result['results'].items()],
+    })
 
 @login_required
+@conditional_on(KPIRecord, sliding_window=True)
+@replica_reads(KPIRecord)
 def kpi_api(request):
-    ensure_sample_data()
-    role = get_role(request.user)
+    role = request_role(request)
     if role not in ['admin', 'manager']:
         return HttpResponseForbidden('Доступ запрещён.')
     metric = request.GET.get('metric')
+    days = request.GET.get('days')
+    points = request.GET.get('points')
+    if points and not days:
+        days = '30'
+    resolution = request.GET.get('resolution', 'auto')
+    period = None
     qs = KPIRecord.objects.all()
+    if days:
+        try:
+            span = timezone.timedelta(days=float(days))
+        except (ValueError, OverflowError):
+            return JsonResponse({'error': 'Некорректный параметр days'}, status=400)
+        since = timezone.now() - span
+        if resolution == 'auto':
+            period = choose_period(span)
+        elif resolution in PERIODS:
+            period = resolution
+        qs = qs.filter(timestamp__gte=since)
+    if points:
+        # ряды по метрикам, прореженные до points точек, без постраничной выдачи
+        try:
+            points = max(3, min(int(points), MAX_CHART_POINTS))
+        except ValueError:
+            return JsonResponse({'error': 'Некорректный параметр points'}, status=400)
+        method = request.GET.get('method', 'lttb')
+        if method not in METHODS:
+            return JsonResponse({'error': 'Некорректный параметр method'}, status=400)
+        series = downsample(kpi_series(since, period=period, metric=metric), points, method)
+        return JsonResponse({'resolution': period or 'raw', 'points': points, 'series': series})
+    size = page_size(request.GET.get('limit'), 500)
+    cursor = request.GET.get('cursor')
+    if period:
+        rollups = KPIRollup.objects.filter(period=period, bucket__gte=bucket_start(since, period))
+        if metric:
+            rollups = rollups.filter(metric=metric)
+        try:
+            rollups, next_cursor = keyset_page(rollups, 'bucket', cursor, size)
+        except InvalidCursor as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+        data = [{
+            'metric': r.metric,
+            'value': r.avg_value,
+            'min': r.min_value,
+            'max': r.max_value,
+            'last': r.last_value,
+            'count': r.count,
+            'timestamp': r.bucket.isoformat(),
+            'service_name': r.service_name,
+        } for r in rollups]
+        return JsonResponse({'resolution': period, 'results': data, 'next': next_cursor})
     if metric:
         qs = qs.filter(metric=metric)
+    try:
+        records, next_cursor = keyset_page(qs, 'timestamp', cursor, size)
+    except InvalidCursor as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
     data = [{
         'metric': r.metric,
         'value': r.value,
         'timestamp': r.timestamp.isoformat(),
         'service_name': r.service_name,
-    } for r in qs[:500]]
-    return JsonResponse({'results': data})
+    } for r in records]
+    return JsonResponse({'resolution': 'raw', 'results': data, 'next': next_cursor})
+
+def _export_response(request, qs, field, columns, name):
+    try:
+        date_from = parse_bound(request.GET.get('from'))
+        date_to = parse_bound(request.GET.get('to'), end=True)
+    except ValueError:
+        return JsonResponse({'error': 'Некорректный параметр from/to'}, status=400)
+    if date_from:
+        qs = qs.filter(**{f'{field}__gte': date_from})
+    if date_to:
+        qs = qs.filter(**{f'{field}__lte': date_to})
+    fmt = 'ndjson' if request.GET.get('format') == 'ndjson' else 'csv'
+    gzip = request.GET.get('gzip') == '1'
+    filename = f"{name}.{fmt}{'.gz' if gzip else ''}"
+    if gzip:
+        content_type = 'application/gzip'
+    elif fmt == 'ndjson':
+        content_type = 'application/x-ndjson; charset=utf-8'
+    else:
+        content_type = 'text/csv; charset=utf-8'
+    rows = stream_rows(qs.order_by(field, 'id'), columns, fmt, gzip)
+    response = StreamingHttpResponse(stream_body(request, rows), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+# выгрузка всей истории потоком: ?format=csv|ndjson&from=&to=&gzip=1
+@login_required
+@replica_reads(KPIRecord)
+def kpi_export(request):
+    role = request_role(request)
+    if role not in ['admin', 'manager']:
+        return HttpResponseForbidden('Доступ запрещён.')
+    qs = KPIRecord.objects.all()
+    metric = request.GET.get('metric')
+    if metric:
+        qs = qs.filter(metric=metric)
+    return _export_response(request, qs, 'timestamp', KPI_COLUMNS, 'kpi')
+
+@login_required
+@replica_reads(OrderQueue)
+def queue_export(request):
+    role = request_role(request)
+    if role not in ['admin', 'manager']:
+        return HttpResponseForbidden('Доступ запрещён.')
+    qs = OrderQueue.objects.all()
+    status = request.GET.get('status')
+    priority = request.GET.get('priority')
+    if status:
+        qs = qs.filter(status=status)
+    if priority:
+        qs = qs.filter(priority=priority)
+    return _export_response(request, qs, 'created_at', ORDER_COLUMNS, 'queue')
+
+# живое обновление списков: поток событий (SSE) после номера ?after= или
+# Last-Event-ID; ?topics=order,incident. Асинхронное представление: под ASGI
+# открытое соединение не занимает поток воркера
+@login_required
+async def changes_stream(request):
+    role = await sync_to_async(request_role)(request)
+    if role not in ['admin', 'manager']:
+        return HttpResponseForbidden('Доступ запрещён.')
+    if not isinstance(request, ASGIRequest):
+        # под WSGI Django дочитывает асинхронный генератор целиком до отправки —
+        # бесконечный поток повис бы навсегда. 204 EventSource не переподключает
+        return HttpResponse(status=204)
+    topics = set(request.GET.get('topics', '').split(',')) & set(TOPICS.values()) or set(TOPICS.values())
+    after = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    try:
+        last_id = max(int(after), 0)
+    except (TypeError, ValueError):
+        # без номера — только события после подключения
+        last_id = await alatest_change_id()
+    response = StreamingHttpResponse(feed.stream(last_id, topics), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен копить ответ в буфере
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _ingest_token_ok(request):
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return False
+    token = header[len('Bearer '):].strip()
+    # compare_digest со строками принимает только ASCII — сравниваем байты,
+    # иначе заголовок с кириллицей дал бы 500 вместо 401
+    return any(hmac.compare_digest(token.encode('utf-8'), t.encode('utf-8')) for t in settings.KPI_INGEST_TOKENS)
+
+# приём KPI от агентов мониторинга: NDJSON или CSV, токен в Authorization
+@csrf_exempt
+@require_POST
+def kpi_ingest(request):
+    if not _ingest_token_ok(request):
+        return JsonResponse({'error': 'Требуется токен агента'}, status=401)
+    content_type = request.content_type
+    if content_type in ('application/x-ndjson', 'application/jsonlines', 'application/json'):
+        rows = iter_ndjson(request)
+    elif content_type in ('text/csv', 'application/csv'):
+        rows = iter_csv(request)
+    else:
+        return JsonResponse({'error': 'Ожидается application/x-ndjson или text/csv'}, status=415)
+    try:
+        result = ingest(rows, batch_size=settings.KPI_INGEST_BATCH_SIZE)
+    except RowError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(result)
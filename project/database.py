@@ -0,0 +1,63 @@
+
+import os
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+# Настройки базы из окружения. По умолчанию — SQLite с WAL: читатели не ждут
+# писателя, а писатели ждут друг друга до busy_timeout вместо ошибки
+# «database is locked». DATABASE_URL=postgres://... переключает на PostgreSQL.
+
+POSTGRES_SCHEMES = ('postgres', 'postgresql', 'pgsql')
+
+def sqlite_pragmas():
+    return {
+        'journal_mode': 'WAL',
+        # в режиме WAL NORMAL не теряет целостность, только последние транзакции при сбое питания
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    }
+
+def sqlite_options(pragmas=None):
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+    return {
+        # выполняется при каждом новом соединении
+        'init_command': ''.join(f'PRAGMA {name}={value};' for name, value in pragmas.items()),
+        # блокировка на запись берётся в начале транзакции: иначе две транзакции,
+        # начавшие с чтения, не могут повысить блокировку и busy_timeout не помогает
+        'transaction_mode': 'IMMEDIATE',
+    }
+
+def _connection_settings():
+    # под ASGI каждый запрос работает в своём потоке, и постоянные соединения
+    # копятся вместо переиспользования — там вместо них пул PostgreSQL (DB_POOL=1)
+    return {
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+def database_from_url(url, base_dir):
+    if not url:
+        return dict(ENGINE='django.db.backends.sqlite3', NAME=base_dir / 'db.sqlite3',
+                    OPTIONS=sqlite_options(), **_connection_settings())
+    parts = urlsplit(url)
+    if parts.scheme == 'sqlite':
+        # sqlite:///относительный/путь или sqlite:////абсолютный/путь
+        path = unquote(parts.path)[1:]
+        return dict(ENGINE='django.db.backends.sqlite3', NAME=base_dir / path if path else base_dir / 'db.sqlite3',
+                    OPTIONS=sqlite_options(), **_connection_settings())
+    if parts.scheme in POSTGRES_SCHEMES:
+        options = dict(parse_qsl(parts.query))
+        if os.environ.get('DB_POOL') == '1':
+            # пул соединений psycopg: нужен пакет psycopg[pool], CONN_MAX_AGE должен быть 0
+            options['pool'] = True
+        return dict(
+            ENGINE='django.db.backends.postgresql',
+            NAME=unquote(parts.path.lstrip('/')),
+            USER=unquote(parts.username or ''),
+            PASSWORD=unquote(parts.password or ''),
+            HOST=parts.hostname or '',
+            PORT=str(parts.port or ''),
+            OPTIONS=options,
+            **_connection_settings(),
+        )
+    raise ValueError(f'DATABASE_URL: неподдерживаемая схема {parts.scheme!r}')
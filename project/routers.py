@@ -0,0 +1,74 @@
+
+import contextvars
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Чтение с реплики: публичные страницы и GET API (декоратор replica_reads)
+# читают с базы REPLICA, всё остальное и любые записи идут на основную.
+# После записи запрос до конца читает с основной базы, а следующие запросы того
+# же клиента — ещё REPLICA_LAG_SECONDS (cookie), чтобы видеть свои изменения.
+
+REPLICA = 'replica'
+PIN_COOKIE = 'db_primary'
+
+# состояние текущего запроса; изменяемый словарь, чтобы отметка о записи из
+# потока sync_to_async была видна и в асинхронной части цепочки
+_state = contextvars.ContextVar('db_routing', default=None)
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+def routing_state():
+    return _state.get()
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state and state['replica'] and not state['pinned'] and replica_configured():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['pinned'] = state['wrote'] = True
+        # явно: иначе объект, прочитанный с реплики, сохранялся бы в неё
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на реплике те же данные, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # схему реплике даёт репликация (или копия базы), а не migrate
+        return db != REPLICA
+
+class ReplicaPinMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        state = {'replica': False, 'pinned': PIN_COOKIE in request.COOKIES, 'wrote': False}
+        _state.set(state)
+        return state
+
+    def _finish(self, state, response):
+        if state['wrote'] and replica_configured():
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_LAG_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self._start(request)
+        return self._finish(state, self.get_response(request))
+
+    async def __acall__(self, request):
+        state = self._start(request)
+        return self._finish(state, await self.get_response(request))
@@ -1 +1,170 @@
-# docx/xlsx generator placeholder
\ No newline at end of file
+import csv
+import io
+import zipfile
+from datetime import datetime, time, timedelta
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Min, Q, Sum
+from django.utils import timezone
+
+from dashboard.models import Incident, KPIRollup, OrderQueue
+
+from .storage import temp_path
+
+# каждый блок отчёта — один агрегирующий запрос с GROUP BY; объём данных
+# в памяти зависит от числа групп, а не от длины периода
+
+def period_bounds(date_from, date_to):
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    return start, end
+
+def order_stats(start, end):
+    has_sla = Q(sla_deadline__isnull=False)
+    # время закрытия заявки не хранится: закрытая заявка считается уложившейся
+    # в SLA, открытая — если срок не истёк к концу периода. Отсчёт от конца
+    # периода, а не от текущего момента: результат зависит только от данных,
+    # и готовый отчёт можно переиспользовать по версии данных
+    hit = has_sla & (Q(status='done') | Q(sla_deadline__gte=end))
+    rows = OrderQueue.objects.filter(created_at__gte=start, created_at__lt=end).values('status', 'priority').annotate(
+        n=Count('id'),
+        sla_total=Count('id', filter=has_sla),
+        sla_hit=Count('id', filter=hit),
+    ).order_by('status', 'priority')
+    rows = list(rows)
+    sla_total = sum(r['sla_total'] for r in rows)
+    sla_hit = sum(r['sla_hit'] for r in rows)
+    return {
+        'rows': rows,
+        'total': sum(r['n'] for r in rows),
+        'sla_total': sla_total,
+        'sla_hit_rate': sla_hit / sla_total if sla_total else None,
+    }
+
+def incident_stats(start, end):
+    closed = Q(closed_at__isnull=False)
+    repair = ExpressionWrapper(F('closed_at') - F('detected_at'), output_field=DurationField())
+    rows = Incident.objects.filter(detected_at__gte=start, detected_at__lt=end).values('criticality').annotate(
+        n=Count('id'),
+        closed=Count('id', filter=closed),
+        mttr=Avg(repair, filter=closed),
+    ).order_by('criticality')
+    rows = list(rows)
+    closed_total = sum(r['closed'] for r in rows)
+    repair_total = sum((r['mttr'] * r['closed'] for r in rows if r['mttr'] is not None), timedelta())
+    return {
+        'rows': rows,
+        'total': sum(r['n'] for r in rows),
+        'mttr': repair_total / closed_total if closed_total else None,
+    }
+
+def kpi_stats(start, end):
+    # дневные агрегаты KPIRollup покрывают период целыми сутками
+    rows = KPIRollup.objects.filter(period='day', bucket__gte=start, bucket__lt=end).values('service_name', 'metric').annotate(
+        n=Sum('count'),
+        s=Sum('total'),
+        lo=Min('min_value'),
+        hi=Max('max_value'),
+    ).order_by('service_name', 'metric')
+    return [{
+        'service_name': r['service_name'],
+        'metric': r['metric'],
+        'count': r['n'],
+        'min': r['lo'],
+        'avg': r['s'] / r['n'] if r['n'] else None,
+        'max': r['hi'],
+    } for r in rows]
+
+def collect_report_data(date_from, date_to):
+    start, end = period_bounds(date_from, date_to)
+    return {
+        'orders': order_stats(start, end),
+        'incidents': incident_stats(start, end),
+        'kpi': kpi_stats(start, end),
+    }
+
+def _fmt_num(value, digits=2):
+    return '—' if value is None else f'{value:.{digits}f}'
+
+def _fmt_rate(value):
+    return '—' if value is None else f'{value * 100:.1f}%'
+
+def _fmt_duration(value):
+    if value is None:
+        return '—'
+    hours = value.total_seconds() / 3600
+    return f'{hours:.1f} ч'
+
+def _sections(report, data):
+    # общее представление отчёта: (заголовок, шапка таблицы, строки) — для docx и CSV
+    orders = data['orders']
+    incidents = data['incidents']
+    status_names = dict(OrderQueue.STATUS_CHOICES)
+    priority_names = dict(OrderQueue.PRIORITY_CHOICES)
+    crit_names = dict(Incident.CRIT_CHOICES)
+    yield ('Сводка', ['Показатель', 'Значение'], [
+        ['Тип отчёта', report.get_report_type_display()],
+        ['Период', f'{report.period_from} – {report.period_to}'],
+        ['Заявок за период', orders['total']],
+        ['Доля заявок в рамках SLA', _fmt_rate(orders['sla_hit_rate'])],
+        ['Инцидентов за период', incidents['total']],
+        ['MTTR (среднее время восстановления)', _fmt_duration(incidents['mttr'])],
+    ])
+    yield ('Заявки по статусам и приоритетам', ['Статус', 'Приоритет', 'Количество', 'С SLA', 'В рамках SLA'], [
+        [status_names.get(r['status'], r['status']), priority_names.get(r['priority'], r['priority']),
+         r['n'], r['sla_total'], r['sla_hit']]
+        for r in orders['rows']
+    ])
+    yield ('Инциденты по критичности', ['Критичность', 'Количество', 'Закрыто', 'MTTR'], [
+        [crit_names.get(r['criticality'], r['criticality']), r['n'], r['closed'], _fmt_duration(r['mttr'])]
+        for r in incidents['rows']
+    ])
+    yield ('KPI по сервисам', ['Сервис', 'Метрика', 'Замеров', 'Мин.', 'Сред.', 'Макс.'], [
+        [r['service_name'], r['metric'], r['count'], _fmt_num(r['min']), _fmt_num(r['avg']), _fmt_num(r['max'])]
+        for r in data['kpi']
+    ])
+
+def _write_docx(path, report, data):
+    from docx import Document as DocxDocument
+    doc = DocxDocument()
+    doc.add_heading('Отчёт по сервисам', level=1)
+    for title, header, rows in _sections(report, data):
+        doc.add_heading(title, level=2)
+        table = doc.add_table(rows=1, cols=len(header))
+        for cell, text in zip(table.rows[0].cells, header):
+            cell.text = str(text)
+        for row in rows:
+            for cell, value in zip(table.add_row().cells, row):
+                cell.text = str(value)
+    # фиксированные даты в свойствах и в архиве: одинаковое содержимое даёт
+    # одинаковый файл, и хранилище по хешу его не дублирует
+    doc.core_properties.created = doc.core_properties.modified = datetime(2000, 1, 1)
+    buf = io.BytesIO()
+    doc.save(buf)
+    with zipfile.ZipFile(buf) as src, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            dst.writestr(zipfile.ZipInfo(info.filename, date_time=(2000, 1, 1, 0, 0, 0)), src.read(info.filename),
+                         compress_type=zipfile.ZIP_DEFLATED)
+
+def _write_csv(path, report, data):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        for title, header, rows in _sections(report, data):
+            writer.writerow([title])
+            writer.writerow(header)
+            writer.writerows(rows)
+            writer.writerow([])
+
+def build_report_file(report):
+    # формирует файл во временном каталоге; в хранилище его переносит storage.store
+    data = collect_report_data(report.period_from, report.period_to)
+    fmt = report.file_format
+    if fmt == 'docx':
+        path = temp_path('docx')
+        try:
+            _write_docx(path, report, data)
+            return path
+        except ImportError:
+            # без python-docx отчёт сохраняется в CSV
+            pass
+    path = temp_path('csv')
+    _write_csv(path, report, data)
+    return path
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import time
+import uuid
+from django.conf import settings
+
+# файлы отчётов хранятся по хешу содержимого: одинаковые отчёты делят один файл
+CAS_DIR = 'reports/cas'
+TMP_DIR = 'reports/tmp'
+
+def temp_path(ext):
+    path_dir = settings.MEDIA_ROOT / TMP_DIR
+    os.makedirs(path_dir, exist_ok=True)
+    return path_dir / f"{uuid.uuid4().hex}.{ext}"
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def store(path):
+    # переносит временный файл в хранилище, возвращает (имя в MEDIA, хеш)
+    digest = file_hash(path)
+    ext = os.path.splitext(path)[1]
+    name = f"{CAS_DIR}/{digest[:2]}/{digest}{ext}"
+    target = settings.MEDIA_ROOT / name
+    if target.exists():
+        os.remove(path)
+        # свежий mtime: до сохранения отчёта файл без ссылки, очистка его не тронет
+        os.utime(target)
+    else:
+        os.makedirs(target.parent, exist_ok=True)
+        os.replace(path, target)
+    return name, digest
+
+def orphan_files(referenced, grace=30 * 60):
+    # файлы хранилища и временные файлы, на которые не ссылается ни один отчёт.
+    # Файл моложе grace секунд может быть ещё в работе: временный пишет обработчик
+    # очереди, а перенесённый store() в хранилище получает ссылку только при
+    # сохранении отчёта. По умолчанию совпадает со сроком зависания задания
+    horizon = time.time() - grace
+    for sub in (CAS_DIR, TMP_DIR):
+        root = settings.MEDIA_ROOT / sub
+        if not root.exists():
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                name = os.path.relpath(full, settings.MEDIA_ROOT).replace(os.sep, '/')
+                if name in referenced:
+                    continue
+                try:
+                    if os.path.getmtime(full) > horizon:
+                        continue
+                except FileNotFoundError:
+                    continue  # файл уже перенесён или удалён
+                yield full